@@ -0,0 +1,165 @@
+"""ASGI server for the analysis API.
+
+Serves ``/api/analyze``, ``/api/health`` and ``/api/metrics`` like the Flask
+app in index.py, but runs analyses on the async pipeline: a request waiting
+on upstreams holds a coroutine rather than a thread, so one process serves
+many concurrent analyses.
+
+    uvicorn asgi:app --app-dir api --port 5050
+
+Background jobs, streaming and batch analysis stay on the Flask app.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from urllib.parse import parse_qs
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from stock_analysis import telemetry, transport
+from stock_analysis.provider_health import get_provider_registry
+from stock_analysis.service import arun_analysis
+
+MAX_BODY_BYTES = 64 * 1024
+_TRUE = {"1", "true", "yes"}
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+    return body
+
+
+async def _respond(send, status: int, body: bytes, content_type: str) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _json(send, body: dict, status: int = 200) -> None:
+    await _respond(send, status, json.dumps(body).encode("utf-8"), "application/json")
+
+
+async def health(scope, receive, send) -> None:
+    await _json(send, {"ok": True, "providers": get_provider_registry().stats()})
+
+
+async def metrics(scope, receive, send) -> None:
+    body = telemetry.registry.prometheus().encode("utf-8")
+    await _respond(send, 200, body, "text/plain; version=0.0.4; charset=utf-8")
+
+
+async def _run_analysis(ticker: str) -> str:
+    if os.getenv("ANALYSIS_ENGINE", "service").strip().lower() == "crew":
+        # The crew is synchronous; give it a worker thread.
+        from stock_analysis.crew import run_crew_analysis
+
+        return str(await asyncio.to_thread(run_crew_analysis, ticker))
+    return await arun_analysis(ticker)
+
+
+async def analyze(scope, receive, send) -> None:
+    ticker_default = os.getenv("COMPANY_STOCK", "AMZN")
+    if scope["method"] == "GET":
+        args = {name: values[-1] for name, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+        ticker = args.get("ticker", ticker_default)
+        run_async = args.get("async", "").lower() in _TRUE
+        timing = args.get("timing", "").lower() in _TRUE
+    else:
+        try:
+            payload = json.loads(await _read_body(receive) or b"{}")
+        except ValueError as exc:
+            await _json(send, {"ok": False, "error": f"invalid request body: {exc}"}, 400)
+            return
+        if not isinstance(payload, dict):
+            payload = {}
+        ticker = payload.get("ticker", ticker_default)
+        run_async = bool(payload.get("async", False))
+        timing = bool(payload.get("timing", False))
+
+    ticker = str(ticker).strip().upper()
+    if not ticker:
+        await _json(send, {"ok": False, "error": "ticker is required"}, 400)
+        return
+    if run_async:
+        await _json(send, {"ok": False, "error": "background jobs are served by the Flask app"}, 400)
+        return
+
+    with telemetry.trace() as spans:
+        try:
+            result = await _run_analysis(ticker)
+            body, status = {"ok": True, "ticker": ticker, "report": str(result)}, 200
+        except Exception as exc:
+            body, status = {"ok": False, "ticker": ticker, "error": str(exc)}, 500
+    if timing:
+        body["timing"] = telemetry.breakdown(spans)
+    await _json(send, body, status)
+
+
+ROUTES = {
+    "/api/health": (health, ("GET",)),
+    "/health": (health, ("GET",)),
+    "/api/metrics": (metrics, ("GET",)),
+    "/metrics": (metrics, ("GET",)),
+    "/api/analyze": (analyze, ("GET", "POST")),
+    "/analyze": (analyze, ("GET", "POST")),
+}
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await transport.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    route = ROUTES.get(scope["path"].rstrip("/") or "/")
+    if route is None:
+        await _json(send, {"ok": False, "error": "not found"}, 404)
+        return
+    handler, methods = route
+    if scope["method"] not in methods:
+        await _json(send, {"ok": False, "error": "method not allowed"}, 405)
+        return
+    await handler(scope, receive, send)
+
+
+def run_local() -> None:
+    import uvicorn
+
+    port = int(os.getenv("PORT", "5000"))
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    run_local()
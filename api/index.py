@@ -1,15 +1,20 @@
+import json
 import os
 import sys
 from pathlib import Path
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
-from stock_analysis.service import run_analysis
+from stock_analysis import telemetry
+from stock_analysis.batch import checkpoint_path, run_batch
+from stock_analysis.jobs import get_job_queue
+from stock_analysis.provider_health import get_provider_registry
+from stock_analysis.service import cache_stats, run_analysis, stream_analysis
 
 app = Flask(__name__, static_folder=str(ROOT_DIR), static_url_path="")
 
@@ -22,7 +27,28 @@ def root():
 @app.get("/api/health")
 @app.get("/health")
 def health():
-    return jsonify({"ok": True})
+    return jsonify({"ok": True, "providers": get_provider_registry().stats()})
+
+
+@app.get("/api/cache")
+@app.get("/cache")
+def cache():
+    return jsonify({"ok": True, **cache_stats()})
+
+
+@app.get("/api/metrics")
+@app.get("/metrics")
+def metrics():
+    return Response(telemetry.registry.prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def _run_analysis(ticker: str) -> str:
+    if os.getenv("ANALYSIS_ENGINE", "service").strip().lower() == "crew":
+        # Imported on demand: crewai is heavy and only needed for this engine.
+        from stock_analysis.crew import run_crew_analysis
+
+        return run_crew_analysis(ticker)
+    return run_analysis(ticker)
 
 
 @app.route("/api/analyze", methods=["GET", "POST"])
@@ -32,19 +58,99 @@ def analyze():
 
     if request.method == "GET":
         ticker = request.args.get("ticker", ticker_default)
+        run_async = request.args.get("async", "").lower() in {"1", "true", "yes"}
+        timing = request.args.get("timing", "").lower() in {"1", "true", "yes"}
     else:
         payload = request.get_json(silent=True) or {}
         ticker = payload.get("ticker", ticker_default)
+        run_async = bool(payload.get("async", False))
+        timing = bool(payload.get("timing", False))
 
     ticker = str(ticker).strip().upper()
     if not ticker:
         return jsonify({"ok": False, "error": "ticker is required"}), 400
 
-    try:
-        result = run_analysis(ticker)
-        return jsonify({"ok": True, "ticker": ticker, "report": str(result)})
-    except Exception as exc:
-        return jsonify({"ok": False, "ticker": ticker, "error": str(exc)}), 500
+    if run_async:
+        job = get_job_queue().submit(ticker)
+        return jsonify({"ok": True, "ticker": ticker, "job_id": job["id"], "status": job["status"]}), 202
+
+    with telemetry.trace() as spans:
+        try:
+            result = _run_analysis(ticker)
+            body, status = {"ok": True, "ticker": ticker, "report": str(result)}, 200
+        except Exception as exc:
+            body, status = {"ok": False, "ticker": ticker, "error": str(exc)}, 500
+    if timing:
+        body["timing"] = telemetry.breakdown(spans)
+    return jsonify(body), status
+
+
+@app.get("/api/jobs/<job_id>")
+@app.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "job not found"}), 404
+    body = {
+        "ok": job["status"] != "failed",
+        "job_id": job["id"],
+        "ticker": job["ticker"],
+        "status": job["status"],
+    }
+    if job["status"] == "done":
+        body["report"] = job["result"]
+    elif job["status"] == "failed":
+        body["error"] = job["error"]
+    return jsonify(body)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/analyze/stream")
+@app.get("/analyze/stream")
+def analyze_stream():
+    ticker = str(request.args.get("ticker", os.getenv("COMPANY_STOCK", "AMZN"))).strip().upper()
+    if not ticker:
+        return jsonify({"ok": False, "error": "ticker is required"}), 400
+
+    def generate():
+        try:
+            for event, data in stream_analysis(ticker):
+                yield _sse(event, data)
+        except Exception as exc:
+            yield _sse("failed", {"ticker": ticker, "error": str(exc)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/analyze/batch")
+@app.post("/analyze/batch")
+def analyze_batch():
+    payload = request.get_json(silent=True) or {}
+    tickers = payload.get("tickers") or []
+    if isinstance(tickers, str):
+        tickers = tickers.split(",")
+    if not isinstance(tickers, list) or not tickers:
+        return jsonify({"ok": False, "error": "tickers must be a non-empty list"}), 400
+
+    max_tickers = int(os.getenv("BATCH_MAX_TICKERS", "500"))
+    if len(tickers) > max_tickers:
+        return jsonify({"ok": False, "error": f"at most {max_tickers} tickers per batch"}), 400
+
+    batch_id = str(payload.get("batch_id", "")).strip()
+    checkpoint = checkpoint_path(batch_id) if batch_id else ""
+
+    def generate():
+        for record in run_batch(tickers, checkpoint=checkpoint):
+            yield json.dumps(record) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 
 def run_local() -> None:
@@ -15,6 +15,59 @@ async function runAnalysis(ticker) {
   return data.report || "No report returned.";
 }
 
+function streamAnalysis(ticker) {
+  return new Promise((resolve, reject) => {
+    const url = `/api/analyze/stream?ticker=${encodeURIComponent(ticker)}`;
+    const source = new EventSource(url);
+    let received = false;
+    let report = "";
+
+    source.addEventListener("progress", (event) => {
+      received = true;
+      const data = JSON.parse(event.data);
+      if (data.stage === "llm") {
+        statusEl.textContent = `Writing report for ${ticker}...`;
+        reportEl.textContent = "";
+      } else if (data.source) {
+        statusEl.textContent = `Gathering context for ${ticker}: ${data.source} done.`;
+      }
+    });
+
+    source.addEventListener("token", (event) => {
+      report += JSON.parse(event.data).text;
+      reportEl.textContent = report;
+    });
+
+    source.addEventListener("report", (event) => {
+      report = JSON.parse(event.data).text;
+      reportEl.textContent = report;
+    });
+
+    source.addEventListener("done", () => {
+      source.close();
+      resolve(report || "No report returned.");
+    });
+
+    source.addEventListener("failed", (event) => {
+      source.close();
+      reject(new Error(JSON.parse(event.data).error));
+    });
+
+    // Connection-level error: fall back to the blocking endpoint if the
+    // stream never started.
+    source.onerror = () => {
+      source.close();
+      if (report) {
+        resolve(`${report}\n\n[stream interrupted]`);
+      } else if (received) {
+        reject(new Error("Stream interrupted."));
+      } else {
+        runAnalysis(ticker).then(resolve, reject);
+      }
+    };
+  });
+}
+
 form.addEventListener("submit", async (event) => {
   event.preventDefault();
   const ticker = tickerInput.value.trim().toUpperCase();
@@ -25,7 +78,9 @@ form.addEventListener("submit", async (event) => {
   reportEl.textContent = "Please wait...";
 
   try {
-    const report = await runAnalysis(ticker);
+    const report = window.EventSource
+      ? await streamAnalysis(ticker)
+      : await runAnalysis(ticker);
     statusEl.textContent = `Completed for ${ticker}.`;
     reportEl.textContent = report;
   } catch (error) {
@@ -0,0 +1,123 @@
+"""Cold-start import cost of the API entry point and the CLI script.
+
+Each target is imported ``--runs`` times in a fresh interpreter under
+``python -X importtime``; the table shows the median total import time,
+the slowest top-level packages, and which heavy dependencies were loaded
+at import rather than on first use.
+
+    python bench/import_time.py
+    python bench/import_time.py --runs 11 --json import_time.json
+    python bench/import_time.py --max-ms 400   # exit 1 if a target is slower
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+
+# name -> (module, extra sys.path entry)
+TARGETS = {
+    "api": ("index", ROOT_DIR / "api"),
+    "cli": ("stock_analysis.main", ROOT_DIR / "src"),
+}
+
+# Should load on first use, never while importing an entry point.
+HEAVY = ("requests", "numpy", "html2text", "crewai")
+
+
+def _parse(stderr: str) -> dict[str, tuple[int, int]]:
+    """``-X importtime`` lines as {module: (self_us, cumulative_us)}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(module: str, path: Path) -> dict[str, tuple[int, int]]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(path), str(ROOT_DIR / "src")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        cwd=str(path),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return _parse(proc.stderr)
+
+
+def run_target(module: str, path: Path, runs: int, top: int) -> dict:
+    # One discarded run so bytecode compilation isn't counted.
+    measure(module, path)
+    samples = [measure(module, path) for _ in range(runs)]
+    totals = [sample[module][1] / 1000 for sample in samples]
+    last = samples[-1]
+    packages: dict[str, int] = {}
+    for name, (_, cumulative) in last.items():
+        root = name.split(".")[0]
+        if name == root:
+            packages[root] = max(packages.get(root, 0), cumulative)
+    slowest = sorted(packages.items(), key=lambda item: -item[1])
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "slowest": [
+            {"package": name, "ms": round(us / 1000, 1)}
+            for name, us in slowest
+            if name != module.split(".")[0]
+        ][:top],
+        "heavy_loaded": [name for name in HEAVY if name in last],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time.")
+    parser.add_argument("--targets", default="", help=f"Comma-separated subset of {', '.join(TARGETS)}.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=5, help="Slowest packages to list per target.")
+    parser.add_argument("--max-ms", type=float, default=0.0, help="Fail if a target's median exceeds this.")
+    parser.add_argument("--json", default="", help="Also write results to this file.")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.targets.split(",") if name.strip()] or list(TARGETS)
+    unknown = [name for name in selected if name not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)} (choose from {', '.join(TARGETS)})")
+
+    results = {name: run_target(*TARGETS[name], args.runs, args.top) for name in selected}
+
+    header = f"{'target':<8}{'module':<24}{'median':>9}{'min':>9}{'max':>9}  heavy modules loaded"
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        heavy = ", ".join(row["heavy_loaded"]) or "none"
+        print(
+            f"{name:<8}{row['module']:<24}{row['median_ms']:>9.1f}{row['min_ms']:>9.1f}"
+            f"{row['max_ms']:>9.1f}  {heavy}"
+        )
+    for name, row in results.items():
+        slowest = ", ".join(f"{item['package']} {item['ms']:.1f}" for item in row["slowest"])
+        print(f"\n{name} slowest packages (ms): {slowest}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"args": vars(args), "results": results}, fh, indent=2)
+    if args.max_ms and any(row["median_ms"] > args.max_ms for row in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
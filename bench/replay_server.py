@@ -0,0 +1,260 @@
+"""Local stand-in for every upstream the analysis talks to.
+
+Requests arrive as ``/{host}{path}?{query}`` (what ``transport`` produces
+when ``HTTP_REPLAY_URL`` points here) and are answered from the fixtures
+listed in ``fixtures/routes.json``. Each route carries a typical upstream
+latency; latency can be scaled, jittered or overridden per host, and a
+share of requests can be failed with 503s.
+
+    python bench/replay_server.py --port 8765 --latency-scale 1 --error-rate 0.02
+    HTTP_REPLAY_URL=http://127.0.0.1:8765 python -m stock_analysis.main
+
+With ``--record``, requests that match no route are forwarded to the real
+upstream once, and the response is saved as a new fixture and route.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _host_values(items: list[str]) -> dict[str, float]:
+    # "api.groq.com=1.5" -> {"api.groq.com": 1.5}
+    values = {}
+    for item in items or []:
+        host, _, value = item.partition("=")
+        if host.strip() and value.strip():
+            values[host.strip().lower()] = float(value)
+    return values
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        fixtures_dir: str = FIXTURES_DIR,
+        latency_scale: float = 1.0,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        host_latency: Optional[dict[str, float]] = None,
+        host_error_rate: Optional[dict[str, float]] = None,
+        record: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        super().__init__(address, ReplayHandler)
+        self.fixtures_dir = fixtures_dir
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.host_latency = host_latency or {}
+        self.host_error_rate = host_error_rate or {}
+        self.record = record
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"served": 0, "injected_errors": 0, "unmatched": 0, "recorded": 0}
+        with open(os.path.join(fixtures_dir, "routes.json"), encoding="utf-8") as fh:
+            self.routes = json.load(fh)["routes"]
+        self._bodies: dict[str, bytes] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def body(self, name: str) -> bytes:
+        if name not in self._bodies:
+            with open(os.path.join(self.fixtures_dir, name), "rb") as fh:
+                self._bodies[name] = fh.read()
+        return self._bodies[name]
+
+    def match(self, method: str, path: str, body: bytes) -> Optional[dict]:
+        best = None
+        for route in self.routes:
+            if route.get("method", "GET") != method or not path.startswith(route["path"]):
+                continue
+            needle = route.get("body_contains")
+            if needle and needle.encode("utf-8") not in body:
+                continue
+            # Longest prefix wins; among equal prefixes the first listed.
+            if best is None or len(route["path"]) > len(best["path"]):
+                best = route
+        return best
+
+    def delay(self, host: str, route: dict) -> float:
+        base = self.host_latency.get(host, route.get("latency", 0.0) * self.latency_scale)
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, base * factor)
+
+    def should_fail(self, host: str) -> bool:
+        rate = self.host_error_rate.get(host, self.error_rate)
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def save_recording(self, method: str, path: str, content_type: str, data: bytes, latency: float) -> None:
+        name = "recorded/" + re.sub(r"[^A-Za-z0-9._-]+", "_", path.strip("/"))[:120]
+        os.makedirs(os.path.join(self.fixtures_dir, "recorded"), exist_ok=True)
+        with open(os.path.join(self.fixtures_dir, name), "wb") as fh:
+            fh.write(data)
+        route = {
+            "method": method,
+            "path": path,
+            "file": name,
+            "content_type": content_type,
+            "latency": round(latency, 3),
+        }
+        with self.lock:
+            self.routes.append(route)
+            self.counters["recorded"] += 1
+            with open(os.path.join(self.fixtures_dir, "routes.json"), "w", encoding="utf-8") as fh:
+                json.dump({"routes": self.routes}, fh, indent=2)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ReplayServer
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._serve("GET")
+
+    def do_POST(self) -> None:
+        self._serve("POST")
+
+    def _send(self, status: int, content_type: str, data: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _serve(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0]
+        host = path.lstrip("/").split("/", 1)[0].lower()
+
+        route = self.server.match(method, path, body)
+        if route is None:
+            if self.server.record:
+                self._record(method, body)
+                return
+            self.server.count("unmatched")
+            self._send(404, "application/json", json.dumps({"error": f"no fixture for {method} {path}"}).encode())
+            return
+
+        time.sleep(self.server.delay(host, route))
+        if self.server.should_fail(host):
+            self.server.count("injected_errors")
+            self._send(503, "application/json", b'{"error": "injected failure"}')
+            return
+
+        self.server.count("served")
+        data = self.server.body(route["file"])
+        chunk_delay = route.get("chunk_delay", 0.0) * self.server.latency_scale
+        if not chunk_delay:
+            self._send(200, route["content_type"], data)
+            return
+        # Stream event by event, like a token-streaming completion.
+        self.send_response(200)
+        self.send_header("Content-Type", route["content_type"])
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in data.split(b"\n\n"):
+            if event.strip():
+                self.wfile.write(event + b"\n\n")
+                self.wfile.flush()
+                time.sleep(chunk_delay)
+
+    def _record(self, method: str, body: bytes) -> None:
+        import requests
+
+        upstream = "https://" + self.path.lstrip("/")
+        headers = {
+            name: value
+            for name, value in self.headers.items()
+            if name.lower() not in {"host", "content-length", "connection", "accept-encoding"}
+        }
+        started = time.monotonic()
+        resp = requests.request(method, upstream, headers=headers, data=body or None, timeout=60)
+        latency = time.monotonic() - started
+        content_type = resp.headers.get("Content-Type", "application/octet-stream")
+        if resp.ok:
+            self.server.save_recording(
+                method, self.path.split("?", 1)[0], content_type, resp.content, latency
+            )
+        self._send(resp.status_code, content_type, resp.content)
+
+
+def start_server(port: int = 0, **options) -> ReplayServer:
+    """Start a replay server on a background thread and return it."""
+    server = ReplayServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="replay-server", daemon=True).start()
+    return server
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve recorded upstream fixtures locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Directory with routes.json and fixture files.")
+    add_fault_arguments(parser)
+    parser.add_argument("--record", action="store_true", help="Forward unmatched requests upstream and save them.")
+    return parser
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for each route's recorded latency (0 = none).")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random +/- fraction applied to every delay.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503.")
+    parser.add_argument("--host-latency", action="append", default=[], metavar="HOST=SECONDS")
+    parser.add_argument("--host-error-rate", action="append", default=[], metavar="HOST=RATE")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def fault_options(args: argparse.Namespace) -> dict:
+    return {
+        "latency_scale": args.latency_scale,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "host_latency": _host_values(args.host_latency),
+        "host_error_rate": _host_values(args.host_error_rate),
+        "seed": args.seed,
+    }
+
+
+def main() -> None:
+    args = _parser().parse_args()
+    server = ReplayServer(
+        ("127.0.0.1", args.port),
+        fixtures_dir=args.fixtures,
+        record=args.record,
+        **fault_options(args),
+    )
+    print(f"Replaying fixtures from {args.fixtures} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
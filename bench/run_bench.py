@@ -0,0 +1,215 @@
+"""Latency and throughput of the analysis paths against the replay server.
+
+Runs each scenario ``--requests`` times across ``--concurrency`` threads
+and reports p50/p99 latency, error count and throughput. Every upstream is
+served by bench/replay_server.py, so runs need no network and no keys and
+are comparable between commits.
+
+    python bench/run_bench.py
+    python bench/run_bench.py --scenarios run_analysis,api_analyze --concurrency 8 --requests 40
+    python bench/run_bench.py --warm --error-rate 0.05 --json bench_output.json
+
+Caches are disabled by default so every request exercises the full
+pipeline; ``--warm`` leaves them on (in a fresh temp directory).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+for path in (BENCH_DIR, ROOT_DIR / "src", ROOT_DIR / "api"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from replay_server import add_fault_arguments, fault_options, start_server  # noqa: E402
+
+TICKERS = ("AMZN", "MSFT", "AAPL", "GOOGL", "NVDA")
+
+
+def _configure_env(replay_url: str, warm: bool) -> None:
+    cache_dir = tempfile.mkdtemp(prefix="stock-analysis-bench-")
+    env = {
+        "HTTP_REPLAY_URL": replay_url,
+        "GROQ_API_KEY": "replay",
+        "GROQ_BASE_URL": "https://api.groq.com/openai/v1",
+        "SEC_API_API_KEY": "replay",
+        "USE_SERPER": "true",
+        "SERPER_API_KEY": "replay",
+        "SEARCH_STARTUP_PROBE": "false",
+        # The replay server may inject errors on purpose; don't retry them away.
+        "HTTP_RETRIES": "0",
+        "HTTP_RATE_LIMITS": os.environ.get("HTTP_RATE_LIMITS", ""),
+        "FILING_CACHE_DIR": os.path.join(cache_dir, "filings"),
+        "JOB_DB_PATH": os.path.join(cache_dir, "jobs.sqlite3"),
+    }
+    if not warm:
+        env.update(
+            {
+                "REPORT_CACHE": "false",
+                "LLM_CACHE": "false",
+                "SEARCH_CACHE": "false",
+                "FILING_CACHE": "false",
+                "FILING_INDEX_MAX": "0",
+                "FILING_META_TTL": "0",
+            }
+        )
+    os.environ.update(env)
+
+
+def _scenarios() -> dict[str, tuple[Callable[[int], object], Callable[[object], bool]]]:
+    # Imported after the environment is set: several modules read it on import.
+    from stock_analysis.service import arun_analysis, run_analysis
+    from stock_analysis.tools.calculator_tool import CalculatorTool
+    from stock_analysis.tools.financial_metrics import FinancialMetricsTool
+    from stock_analysis.tools.sec_tools import SEC10KTool, SEC10QTool
+    from stock_analysis.tools.web_tools import BraveSearchAliasTool
+
+    from index import app
+
+    def ticker(i: int) -> str:
+        return TICKERS[i % len(TICKERS)]
+
+    def api_analyze(i: int):
+        with app.test_client() as client:
+            return client.get(f"/api/analyze?ticker={ticker(i)}")
+
+    # Every bench thread submits to one event loop, as requests would under
+    # an ASGI server: --concurrency is the number of analyses in flight.
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="bench-loop", daemon=True).start()
+
+    def async_analysis(i: int):
+        return asyncio.run_coroutine_threadsafe(arun_analysis(ticker(i)), loop).result()
+
+    search, sec_10q, sec_10k = BraveSearchAliasTool(), SEC10QTool(), SEC10KTool()
+    metrics, calculator = FinancialMetricsTool(), CalculatorTool()
+    expressions = "revenue = 637959; net_income = 59248; margin = net_income / revenue * 100; growth = (637959 / 574785 - 1) * 100"
+
+    def report_ok(report) -> bool:
+        return bool(report) and not str(report).startswith("LLM generation failed")
+
+    return {
+        "run_analysis": (lambda i: run_analysis(ticker(i)), report_ok),
+        "async_analysis": (async_analysis, report_ok),
+        "api_analyze": (
+            api_analyze,
+            lambda resp: resp.status_code == 200 and report_ok(resp.get_json().get("report")),
+        ),
+        "tool_web_search": (
+            lambda i: search._run(f"{ticker(i)} stock news"),
+            lambda text: "limited data" not in text,
+        ),
+        "tool_sec_10q": (
+            lambda i: sec_10q._run("revenue guidance liquidity", "AMZN"),
+            lambda text: text.startswith("Ticker:"),
+        ),
+        "tool_sec_10k": (
+            lambda i: sec_10k._run("risk factors competition", "AMZN"),
+            lambda text: text.startswith("Ticker:"),
+        ),
+        "tool_financial_metrics": (
+            lambda i: metrics._run(", ".join(TICKERS[: 1 + i % 3])),
+            lambda text: "SEC XBRL" in text,
+        ),
+        "tool_calculator": (lambda i: calculator._run(expressions), lambda result: "margin" in result),
+    }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    # Nearest-rank percentile; values must be sorted.
+    if not values:
+        return math.nan
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+def run_scenario(
+    fn: Callable[[int], object], ok: Callable[[object], bool], requests: int, concurrency: int
+) -> dict:
+    def timed(i: int) -> tuple[float, bool]:
+        started = time.perf_counter()
+        try:
+            passed = ok(fn(i))
+        except Exception:
+            passed = False
+        return time.perf_counter() - started, passed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, passed in results if not passed),
+        "mean_s": round(sum(latencies) / len(latencies), 4),
+        "p50_s": round(_percentile(latencies, 50), 4),
+        "p99_s": round(_percentile(latencies, 99), 4),
+        "max_s": round(latencies[-1], 4),
+        "throughput_rps": round(requests / wall, 2),
+    }
+
+
+def _print_table(results: dict[str, dict]) -> None:
+    header = f"{'scenario':<24}{'n':>5}{'conc':>6}{'err':>5}{'mean':>9}{'p50':>9}{'p99':>9}{'max':>9}{'req/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        print(
+            f"{name:<24}{row['requests']:>5}{row['concurrency']:>6}{row['errors']:>5}"
+            f"{row['mean_s']:>9.3f}{row['p50_s']:>9.3f}{row['p99_s']:>9.3f}{row['max_s']:>9.3f}"
+            f"{row['throughput_rps']:>9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis paths offline.")
+    parser.add_argument("--scenarios", default="", help="Comma-separated subset (default: all).")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warm", action="store_true", help="Keep caches on.")
+    parser.add_argument("--replay-url", default="", help="Use a running replay server instead of starting one.")
+    parser.add_argument("--json", default="", help="Also write results to this file.")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    replay_url = args.replay_url
+    if not replay_url:
+        server = start_server(**fault_options(args))
+        replay_url = server.url
+    _configure_env(replay_url, args.warm)
+
+    scenarios = _scenarios()
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()] or list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    results = {}
+    for name in selected:
+        fn, ok = scenarios[name]
+        results[name] = run_scenario(fn, ok, args.requests, args.concurrency)
+    _print_table(results)
+    if server is not None:
+        print(f"\nreplay server: {server.counters}")
+        server.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"args": vars(args), "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator
+
+try:
+    from .service import build_context, generate_report
+except ImportError:
+    from service import build_context, generate_report
+
+
+def _unique_tickers(tickers: Iterable[str]) -> list[str]:
+    seen = []
+    for ticker in tickers:
+        ticker = str(ticker or "").strip().upper()
+        if ticker and ticker not in seen:
+            seen.append(ticker)
+    return seen
+
+
+def checkpoint_path(batch_id: str) -> str:
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", batch_id)[:100]
+    root = os.getenv("BATCH_CHECKPOINT_DIR", "").strip() or os.path.join(
+        tempfile.gettempdir(), "stock_analysis", "batches"
+    )
+    os.makedirs(root, exist_ok=True)
+    return os.path.join(root, f"{safe_id}.jsonl")
+
+
+def _load_checkpoint(path: str) -> dict[str, dict]:
+    done = {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves at most one torn last line.
+                    continue
+                if record.get("ticker"):
+                    done[record["ticker"]] = record
+    except FileNotFoundError:
+        pass
+    return done
+
+
+class _Checkpoint:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record: dict) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+
+
+def run_batch(
+    tickers: Iterable[str],
+    checkpoint: str = "",
+    max_workers: int = 0,
+    max_llm_calls: int = 0,
+) -> Iterator[dict]:
+    """Analyze many tickers, yielding one result dict per ticker as it finishes.
+
+    Context fetches run on a thread pool. The filing metadata and filing text
+    caches are shared, so concurrent tickers that need the same upstream data
+    coalesce onto one fetch. At most ``max_llm_calls`` completions are in
+    flight at once. Successful tickers are appended to ``checkpoint`` (JSON
+    lines). A rerun with the same file yields them again with ``resumed``
+    set and only analyzes the rest.
+    """
+    max_workers = max_workers or int(os.getenv("BATCH_WORKERS", "8"))
+    max_llm_calls = max_llm_calls or int(os.getenv("BATCH_MAX_LLM_CALLS", "4"))
+    llm_slots = threading.BoundedSemaphore(max_llm_calls)
+    tickers = _unique_tickers(tickers)
+
+    done = _load_checkpoint(checkpoint) if checkpoint else {}
+    for ticker in tickers:
+        if ticker in done:
+            yield {**done[ticker], "resumed": True}
+    pending = [ticker for ticker in tickers if ticker not in done]
+    if not pending:
+        return
+
+    writer = _Checkpoint(checkpoint)
+
+    def analyze(ticker: str) -> dict:
+        try:
+            context = build_context(ticker)
+            with llm_slots:
+                # Not complete_report: its raw-context fallback would pass
+                # for a success and be checkpointed, so resume never retried it.
+                report = generate_report(ticker, context)
+            return {"ticker": ticker, "ok": True, "report": report}
+        except Exception as exc:
+            return {"ticker": ticker, "ok": False, "error": str(exc)}
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(pending)), thread_name_prefix="batch"
+    ) as executor:
+        futures = [executor.submit(analyze, ticker) for ticker in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            # Failures are not checkpointed so a rerun retries them.
+            if record["ok"]:
+                writer.append(record)
+            yield record
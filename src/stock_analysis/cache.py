@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+try:
+    from . import telemetry
+except ImportError:
+    import telemetry
+
+_MISSING = object()
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class _Pending:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = _MISSING
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """In-process LRU cache with per-entry TTL and request coalescing.
+
+    When ``shared_dir`` is set, entries are also written there as JSON so
+    other worker processes can reuse them; values must then be
+    JSON-serializable. Expired files are deleted when read, and a sweep at
+    most every few minutes drops the rest of the expired ones and keeps the
+    directory to ``max_entries`` files.
+    """
+
+    _sweep_seconds = 300.0
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        shared_dir: str = "",
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared_dir = shared_dir
+        self._entries: OrderedDict = OrderedDict()
+        self._pending: dict = {}
+        self._async_pending: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._swept_at: Optional[float] = None
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    def _shared_path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.shared_dir, digest + ".json")
+
+    def _get_local(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: Hashable, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_shared(self, key: Hashable) -> tuple[Any, float]:
+        if not self.shared_dir:
+            return _MISSING, 0.0
+        path = self._shared_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return _MISSING, 0.0
+        expires_at = float(entry.get("expires_at", 0))
+        if expires_at < time.time():
+            _unlink(path)
+            return _MISSING, 0.0
+        return entry.get("value"), expires_at
+
+    def _set_shared(self, key: Hashable, value: Any, expires_at: float) -> None:
+        if not self.shared_dir:
+            return
+        try:
+            payload = json.dumps({"expires_at": expires_at, "value": value})
+        except (TypeError, ValueError):
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.shared_dir, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                fh.write(payload)
+            # The expiry doubles as the mtime, so a sweep can tell expired
+            # files apart without reading them.
+            os.utime(tmp_path, (expires_at, expires_at))
+            os.replace(tmp_path, self._shared_path(key))
+        except OSError:
+            _unlink(tmp_path)
+            return
+        now = time.monotonic()
+        with self._lock:
+            due = self._swept_at is None or now - self._swept_at > self._sweep_seconds
+            if due:
+                self._swept_at = now
+        if due:
+            self._sweep_shared()
+
+    def _sweep_shared(self) -> None:
+        now = time.time()
+        live = []
+        try:
+            names = os.listdir(self.shared_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.shared_dir, name)
+            try:
+                expires_at = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if expires_at < now:
+                _unlink(path)
+            else:
+                live.append((expires_at, path))
+        # Past the cap, drop the entries closest to expiry first.
+        live.sort()
+        for _, path in live[: max(0, len(live) - self.max_entries)]:
+            _unlink(path)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._get_local(key)
+        if value is _MISSING:
+            value, expires_at = self._get_shared(key)
+            if value is not _MISSING:
+                with self._lock:
+                    self._set_local(key, value, expires_at)
+        if value is _MISSING:
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._set_local(key, value, expires_at)
+        self._set_shared(key, value, expires_at)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value, calling ``loader`` at most once per key.
+
+        Concurrent misses for the same key wait for the first caller's load
+        instead of issuing their own. Exceptions from ``loader`` propagate to
+        every waiter and nothing is cached. The outcome (hit, miss or
+        coalesced) is recorded on the caller's open span.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            telemetry.record("cache", "hit")
+            return value
+
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = _Pending()
+                self._pending[key] = pending
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        telemetry.record("cache", "miss" if owner else "coalesced")
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = loader()
+            self.set(key, pending.value)
+            return pending.value
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Async :meth:`get_or_load`: concurrent misses on one event loop share
+        a single load.
+
+        The load runs as its own task, so a waiter that is cancelled (e.g. by
+        a timeout) doesn't cancel it for the others, and its result is still
+        cached.
+        """
+        import asyncio
+
+        with self._lock:
+            value = self._get_local(key)
+        if value is _MISSING and self.shared_dir:
+            # The shared directory is disk I/O; keep it off the loop.
+            value = await asyncio.to_thread(self.get, key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            telemetry.record("cache", "hit")
+            return value
+
+        pending_key = (id(asyncio.get_running_loop()), key)
+
+        async def load() -> Any:
+            try:
+                loaded = await loader()
+                if self.shared_dir:
+                    await asyncio.to_thread(self.set, key, loaded)
+                else:
+                    self.set(key, loaded)
+                return loaded
+            finally:
+                with self._lock:
+                    self._async_pending.pop(pending_key, None)
+
+        with self._lock:
+            task = self._async_pending.get(pending_key)
+            if task is None:
+                task = self._async_pending[pending_key] = asyncio.ensure_future(load())
+                # Retrieve the exception even if every waiter has gone.
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                self.misses += 1
+                outcome = "miss"
+            else:
+                self.coalesced += 1
+                outcome = "coalesced"
+        telemetry.record("cache", outcome)
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4)
+                if lookups
+                else 0.0,
+            }
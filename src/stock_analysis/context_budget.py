@@ -0,0 +1,177 @@
+import math
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+try:
+    from .filing_index import query_terms
+except ImportError:
+    from filing_index import query_terms
+
+# Llama/GPT-style BPE vocabularies average about four characters of English
+# per token; close enough for budgeting without shipping a tokenizer.
+CHARS_PER_TOKEN = 4.0
+# Below this many tokens a truncated unit is more noise than evidence.
+MIN_PARTIAL_TOKENS = 24
+
+_SENTENCE_END_RE = re.compile(r"[.!?;](?=\s)")
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class Section:
+    """One titled block of the prompt context.
+
+    ``units`` are the trimmable pieces (headlines, passages, metric lines)
+    in rank order, best first. The ``header`` is always kept. With
+    ``keep_order`` the units that fit are printed in their original order
+    instead of rank order.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        units: list[str],
+        header: str = "",
+        joiner: str = "\n",
+        weight: float = 1.0,
+        keep_order: bool = False,
+    ) -> None:
+        self.title = title
+        self.units = units
+        self.header = header
+        self.joiner = joiner
+        self.weight = weight
+        self.keep_order = keep_order
+
+    def render(self, units: list[str]) -> str:
+        body = self.joiner.join(units)
+        return "\n".join(part for part in (self.header, body) if part)
+
+    def demand(self) -> int:
+        return estimate_tokens(self.render(self.units))
+
+
+def allocate_budget(sections: dict[str, Section], budget: int) -> dict[str, int]:
+    """Split ``budget`` by weight, handing unused share to sections that need it.
+
+    Sections asking for less than their weighted share get exactly what they
+    ask for; the remainder is re-split among the rest until it runs out.
+    """
+    pending = {name: section.demand() for name, section in sections.items()}
+    allocation: dict[str, int] = {}
+    remaining = budget
+    while pending:
+        total_weight = sum(sections[name].weight for name in pending)
+        shares = {
+            name: remaining * sections[name].weight / total_weight for name in pending
+        }
+        satisfied = [name for name, demand in pending.items() if demand <= shares[name]]
+        if not satisfied:
+            for name in pending:
+                allocation[name] = int(shares[name])
+            break
+        for name in satisfied:
+            allocation[name] = pending.pop(name)
+            remaining -= allocation[name]
+    return allocation
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    """Cut ``text`` to about ``tokens``, preferring a sentence, then a word, end."""
+    limit = int(tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_ends = [match.end() for match in _SENTENCE_END_RE.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] >= limit // 2:
+        return cut[: sentence_ends[-1]]
+    space = cut.rfind(" ")
+    return (cut[:space] if space >= limit // 2 else cut).rstrip() + " ..."
+
+
+def fit_section(section: Section, tokens: int) -> str:
+    """Render as many of the section's best units as fit in ``tokens``."""
+    if section.demand() <= tokens:
+        return section.render(section.units)
+    available = tokens - estimate_tokens(section.header)
+    joiner_tokens = estimate_tokens(section.joiner)
+    chosen: list[tuple[int, str]] = []
+    for position, unit in enumerate(section.units):
+        cost = estimate_tokens(unit) + (joiner_tokens if chosen else 0)
+        if cost <= available:
+            chosen.append((position, unit))
+            available -= cost
+        elif available >= MIN_PARTIAL_TOKENS:
+            chosen.append((position, truncate_to_tokens(unit, available - joiner_tokens)))
+            break
+        else:
+            break
+    if section.keep_order:
+        chosen.sort()
+    return section.render([unit for _, unit in chosen])
+
+
+def assemble(sections: dict[str, Section], budget: int) -> str:
+    allocation = allocate_budget(sections, budget)
+    blocks = []
+    for name, section in sections.items():
+        blocks.append(f"{section.title}:\n{fit_section(section, allocation[name])}")
+    return "\n\n".join(blocks) + "\n"
+
+
+def _headline_words(item: dict) -> set[str]:
+    return set(_WORD_RE.findall(item.get("title", "").lower()))
+
+
+def dedupe_headlines(groups: list[list[dict]], threshold: float = 0.6) -> list[list[dict]]:
+    """Drop headlines already seen in an earlier group (or earlier in the same one).
+
+    Syndicated stories reach the feed under slightly different titles, so a
+    headline also counts as seen when its words overlap an earlier one's by
+    ``threshold`` (Jaccard) or more.
+    """
+    seen_links: set[str] = set()
+    seen_words: list[set[str]] = []
+    result = []
+    for items in groups:
+        kept = []
+        for item in items:
+            words = _headline_words(item)
+            link = item.get("link", "")
+            if link and link in seen_links:
+                continue
+            if words and any(
+                len(words & other) / len(words | other) >= threshold for other in seen_words
+            ):
+                continue
+            seen_links.add(link)
+            seen_words.append(words)
+            kept.append(item)
+        result.append(kept)
+    return result
+
+
+def rank_headlines(
+    items: list[dict], query: str, now: Optional[datetime] = None, half_life_days: float = 3.0
+) -> list[dict]:
+    """Order headlines by query-term overlap plus a recency boost."""
+    now = now or datetime.now(timezone.utc)
+    terms = set(query_terms(query))
+
+    def score(item: dict) -> float:
+        words = _headline_words(item)
+        relevance = len(terms & words) / len(terms) if terms else 0.0
+        recency = 0.0
+        if item.get("published"):
+            try:
+                age = now - datetime.fromisoformat(item["published"])
+                recency = 0.5 ** (max(age.total_seconds(), 0.0) / 86400 / half_life_days)
+            except ValueError:
+                pass
+        return relevance + recency
+
+    return sorted(items, key=score, reverse=True)
@@ -1,4 +1,8 @@
+import functools
 import os
+import queue
+import threading
+from typing import Optional
 
 from crewai import Agent, Crew, LLM, Process, Task
 from crewai.project import CrewBase, agent, crew, task
@@ -6,43 +10,71 @@ from dotenv import load_dotenv
 
 try:
     from .tools.calculator_tool import CalculatorTool
+    from .tools.financial_metrics import FinancialMetricsTool
     from .tools.sec_tools import SEC10KTool, SEC10QTool
     from .tools.web_tools import BraveSearchAliasTool
 except ImportError:
     from tools.calculator_tool import CalculatorTool
+    from tools.financial_metrics import FinancialMetricsTool
     from tools.sec_tools import SEC10KTool, SEC10QTool
     from tools.web_tools import BraveSearchAliasTool
 
 load_dotenv()
 
 
+@functools.lru_cache(maxsize=4)
+def _shared_llm(
+    model: str, api_key: str, base_url: str, max_tokens: int, temperature: float
+) -> LLM:
+    # One client per distinct configuration, shared by every agent and run.
+    return LLM(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        max_tokens=max_tokens,
+        temperature=temperature,
+    )
+
+
+_tools: dict[type, object] = {}
+_tools_lock = threading.Lock()
+
+
+def _shared_tool(tool_cls: type):
+    # Tools are stateless apart from process-wide caches, so every agent can
+    # use the same instance.
+    with _tools_lock:
+        if tool_cls not in _tools:
+            _tools[tool_cls] = tool_cls()
+        return _tools[tool_cls]
+
+
 @CrewBase
 class StockAnalysisCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
     def _llm(self) -> LLM:
-        model = os.getenv("MODEL", "llama-3.1-8b-instant")
         max_tokens = int(os.getenv("MAX_TOKENS", "280"))
         temperature = float(os.getenv("TEMPERATURE", "0.2"))
         groq_api_key = os.getenv("GROQ_API_KEY")
         if groq_api_key:
-            return LLM(
-                model=model,
-                api_key=groq_api_key,
-                base_url=os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
-                max_tokens=max_tokens,
-                temperature=temperature,
+            return _shared_llm(
+                os.getenv("MODEL", "llama-3.1-8b-instant"),
+                groq_api_key,
+                os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
+                max_tokens,
+                temperature,
             )
 
         xai_api_key = os.getenv("XAI_API_KEY")
         if xai_api_key:
-            return LLM(
-                model=os.getenv("XAI_MODEL", "grok-2-latest"),
-                api_key=xai_api_key,
-                base_url=os.getenv("XAI_BASE_URL", "https://api.x.ai/v1"),
-                max_tokens=max_tokens,
-                temperature=temperature,
+            return _shared_llm(
+                os.getenv("XAI_MODEL", "grok-2-latest"),
+                xai_api_key,
+                os.getenv("XAI_BASE_URL", "https://api.x.ai/v1"),
+                max_tokens,
+                temperature,
             )
 
         raise ValueError("Set GROQ_API_KEY or XAI_API_KEY in .env before running.")
@@ -50,6 +82,12 @@ class StockAnalysisCrew:
     def _agent_max_iter(self) -> int:
         return int(os.getenv("AGENT_MAX_ITER", "4"))
 
+    def _parallel(self) -> bool:
+        # research, financial_analysis and filings_analysis don't read each
+        # other's output, so they can run at the same time; recommend waits
+        # for all three through its context.
+        return os.getenv("CREW_PARALLEL", "true").strip().lower() in {"1", "true", "yes"}
+
     @agent
     def research_analyst_agent(self) -> Agent:
         return Agent(
@@ -57,7 +95,7 @@ class StockAnalysisCrew:
             verbose=True,
             llm=self._llm(),
             tools=[
-                BraveSearchAliasTool(),
+                _shared_tool(BraveSearchAliasTool),
             ],
             max_iter=self._agent_max_iter(),
             max_retry_limit=1,
@@ -68,6 +106,7 @@ class StockAnalysisCrew:
         return Task(
             config=self.tasks_config["research"],
             agent=self.research_analyst_agent(),
+            async_execution=self._parallel(),
         )
 
     @agent
@@ -77,8 +116,9 @@ class StockAnalysisCrew:
             verbose=True,
             llm=self._llm(),
             tools=[
-                CalculatorTool(),
-                BraveSearchAliasTool(),
+                _shared_tool(FinancialMetricsTool),
+                _shared_tool(CalculatorTool),
+                _shared_tool(BraveSearchAliasTool),
             ],
             max_iter=self._agent_max_iter(),
             max_retry_limit=1,
@@ -91,9 +131,9 @@ class StockAnalysisCrew:
             verbose=True,
             llm=self._llm(),
             tools=[
-                BraveSearchAliasTool(),
-                SEC10QTool(),
-                SEC10KTool(),
+                _shared_tool(BraveSearchAliasTool),
+                _shared_tool(SEC10QTool),
+                _shared_tool(SEC10KTool),
             ],
             max_iter=self._agent_max_iter(),
             max_retry_limit=1,
@@ -104,6 +144,7 @@ class StockAnalysisCrew:
         return Task(
             config=self.tasks_config["financial_analysis"],
             agent=self.financial_analyst_agent(),
+            async_execution=self._parallel(),
         )
 
     @task
@@ -111,6 +152,7 @@ class StockAnalysisCrew:
         return Task(
             config=self.tasks_config["filings_analysis"],
             agent=self.filings_analyst_agent(),
+            async_execution=self._parallel(),
         )
 
     @agent
@@ -120,7 +162,7 @@ class StockAnalysisCrew:
             verbose=True,
             llm=self._llm(),
             tools=[
-                CalculatorTool(),
+                _shared_tool(CalculatorTool),
             ],
             max_iter=self._agent_max_iter(),
             max_retry_limit=1,
@@ -131,6 +173,7 @@ class StockAnalysisCrew:
         return Task(
             config=self.tasks_config["recommend"],
             agent=self.investment_advisor_agent(),
+            context=[self.research(), self.financial_analysis(), self.filings_analysis()],
         )
 
     @crew
@@ -141,3 +184,60 @@ class StockAnalysisCrew:
             process=Process.sequential,
             verbose=True,
         )
+
+
+class CrewRuntime:
+    """Long-lived crews for a server process.
+
+    Tools and the LLM client are shared by every crew. Agents keep per-run
+    state, so each kickoff borrows a crew of its own from a pool that grows
+    on demand to ``size``; kickoffs beyond that wait for one to come back.
+    A reused crew only re-interpolates the task templates for the new ticker.
+    """
+
+    def __init__(self, size: int = 4) -> None:
+        self.size = max(1, size)
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._built = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Crew:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            build = self._built < self.size
+            if build:
+                self._built += 1
+        if not build:
+            return self._idle.get()
+        try:
+            return StockAnalysisCrew().crew()
+        except BaseException:
+            with self._lock:
+                self._built -= 1
+            raise
+
+    def kickoff(self, ticker: str):
+        crew = self._acquire()
+        try:
+            return crew.kickoff(inputs={"company_stock": ticker})
+        finally:
+            self._idle.put(crew)
+
+
+_runtime: Optional[CrewRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_crew_runtime() -> CrewRuntime:
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = CrewRuntime(int(os.getenv("CREW_POOL_SIZE", "4")))
+        return _runtime
+
+
+def run_crew_analysis(ticker: str) -> str:
+    return str(get_crew_runtime().kickoff(ticker.strip().upper()))
@@ -0,0 +1,111 @@
+import xml.etree.ElementTree as ET
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator
+from urllib.parse import quote
+
+try:
+    from . import transport
+except ImportError:
+    import transport
+
+
+def google_news_url(query: str) -> str:
+    return (
+        "https://news.google.com/rss/search?"
+        f"q={quote(query)}&hl=en-US&gl=US&ceid=US:en"
+    )
+
+
+def _parse_date(value: str) -> str:
+    """RFC 822 feed date as a UTC ISO 8601 string, or "" when unparseable.
+
+    Strings keep items JSON-serializable for the shared caches and still
+    sort chronologically.
+    """
+    try:
+        published = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return ""
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published.astimezone(timezone.utc).isoformat()
+
+
+def _feed_item(elem: ET.Element) -> dict:
+    title = (elem.findtext("title") or "").strip()
+    source = (elem.findtext("source") or "").strip()
+    # Google News appends " - Publisher" to every title; the publisher is
+    # kept separately.
+    if source and title.endswith(f" - {source}"):
+        title = title[: -len(source) - 3].rstrip()
+    return {
+        "title": title,
+        "link": (elem.findtext("link") or "").strip(),
+        "published": _parse_date((elem.findtext("pubDate") or "").strip()),
+        "source": source,
+    }
+
+
+def _read_items(parser: ET.XMLPullParser) -> Iterator[dict]:
+    for _, elem in parser.read_events():
+        if elem.tag == "item":
+            yield _feed_item(elem)
+            elem.clear()
+
+
+def parse_feed(chunks: Iterable[bytes], limit: int) -> Iterator[dict]:
+    """Yield up to ``limit`` RSS items from raw body chunks.
+
+    Bytes go straight to the XML parser, which honours the feed's own
+    encoding declaration. Each item is yielded as soon as its closing tag
+    arrives, so the caller can stop reading once it has enough.
+    """
+    if limit <= 0:
+        return
+    parser = ET.XMLPullParser(events=("end",))
+    count = 0
+    for chunk in chunks:
+        parser.feed(chunk)
+        for item in _read_items(parser):
+            yield item
+            count += 1
+            if count >= limit:
+                return
+    parser.close()
+
+
+def fetch_feed(url: str, limit: int, timeout: float = 20) -> list[dict]:
+    resp = transport.get(url, timeout=timeout, stream=True)
+    try:
+        resp.raise_for_status()
+        return list(parse_feed(resp.iter_content(chunk_size=16 * 1024), limit))
+    finally:
+        # Closing early drops the rest of the feed once enough items are in.
+        transport.finish(resp)
+
+
+async def afetch_feed(url: str, limit: int, timeout: float = 20) -> list[dict]:
+    """Async :func:`fetch_feed`; stops reading once ``limit`` items are parsed."""
+    items: list[dict] = []
+    if limit <= 0:
+        return items
+    parser = ET.XMLPullParser(events=("end",))
+    async with transport.astream("GET", url, timeout=timeout) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes(16 * 1024):
+            parser.feed(chunk)
+            items.extend(_read_items(parser))
+            if len(items) >= limit:
+                return items[:limit]
+    parser.close()
+    items.extend(_read_items(parser))
+    return items[:limit]
+
+
+def format_item(item: dict) -> str:
+    """One-line summary: title, then publisher and date when known."""
+    details = [item["source"]] if item["source"] else []
+    if item["published"]:
+        details.append(item["published"][:10])
+    return f"{item['title']} ({', '.join(details)})" if details else item["title"]
@@ -0,0 +1,113 @@
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict, defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were",
+    "our", "its", "has", "have", "any", "not", "all", "into", "about", "what",
+}
+
+
+def query_terms(query: str) -> list[str]:
+    terms = []
+    for term in _TOKEN_RE.findall(query.lower()):
+        if len(term) >= 3 and term not in _STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class FilingIndex:
+    """Positional token index over one filing, searched with BM25 passages.
+
+    The text is cut into overlapping windows of ``passage_tokens`` tokens.
+    Windows all have the same length, so BM25 length normalization drops out
+    and a window scores by how densely it repeats the rarer query terms.
+    A table-of-contents line that mentions each term once loses to the
+    section that actually discusses them.
+    """
+
+    k1 = 1.2
+
+    def __init__(self, text: str, passage_tokens: int = 60, stride: int = 30) -> None:
+        self.text = text
+        self.passage_tokens = passage_tokens
+        self.stride = stride
+        self._starts = array("I")
+        self._ends = array("I")
+        self._postings: dict[str, array] = defaultdict(lambda: array("I"))
+        for position, match in enumerate(_TOKEN_RE.finditer(text.lower())):
+            self._starts.append(match.start())
+            self._ends.append(match.end())
+            self._postings[match.group()].append(position)
+        self._postings = dict(self._postings)
+        token_count = len(self._starts)
+        self.passage_count = max(
+            1, math.ceil(max(0, token_count - passage_tokens) / stride) + 1
+        )
+        self._results: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _passage_counts(self, term: str) -> dict[int, int]:
+        counts: dict[int, int] = defaultdict(int)
+        window, stride = self.passage_tokens, self.stride
+        for position in self._postings.get(term, ()):
+            first = max(0, (position - window) // stride + 1)
+            last = min(position // stride, self.passage_count - 1)
+            for passage in range(first, last + 1):
+                counts[passage] += 1
+        return counts
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, int, int]]:
+        """Return up to ``k`` non-overlapping ``(score, start, end)`` spans."""
+        cache_key = (query, k)
+        with self._lock:
+            if cache_key in self._results:
+                self._results.move_to_end(cache_key)
+                return self._results[cache_key]
+
+        scores: dict[int, float] = defaultdict(float)
+        for term in query_terms(query)[:12]:
+            counts = self._passage_counts(term)
+            if not counts:
+                continue
+            df = len(counts)
+            idf = math.log(1 + (self.passage_count - df + 0.5) / (df + 0.5))
+            for passage, tf in counts.items():
+                scores[passage] += idf * tf * (self.k1 + 1) / (tf + self.k1)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        taken: list[int] = []
+        results = []
+        spacing = math.ceil(self.passage_tokens / self.stride)
+        for passage, score in ranked:
+            if len(results) >= k:
+                break
+            if any(abs(passage - other) < spacing for other in taken):
+                continue
+            taken.append(passage)
+            first = passage * self.stride
+            last = min(first + self.passage_tokens, len(self._starts)) - 1
+            results.append((score, self._starts[first], self._ends[last]))
+
+        with self._lock:
+            self._results[cache_key] = results
+            if len(self._results) > 64:
+                self._results.popitem(last=False)
+        return results
+
+    def snippet(self, query: str, max_chars: int, k: int = 3) -> str:
+        spans = []
+        budget = max_chars
+        for _, start, end in self.search(query, k):
+            if budget <= 0:
+                break
+            end = min(end, start + budget)
+            spans.append((start, end))
+            budget -= end - start
+        if not spans:
+            return self.text[:max_chars]
+        # Best passage first: callers truncate the tail.
+        return " ... ".join(self.text[start:end] for start, end in spans)
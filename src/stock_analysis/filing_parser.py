@@ -0,0 +1,203 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import AsyncIterable, Iterable, Optional
+
+# Canonical section names, matched against the heading text that follows
+# "Item N." so 10-K and 10-Q numbering (Item 7 vs Part I Item 2) both work.
+SECTION_TITLES = (
+    ("risk_factors", ("risk factors",)),
+    ("mdna", ("management's discussion", "management’s discussion", "managements discussion")),
+    ("market_risk", ("quantitative and qualitative",)),
+    ("financial_statements", ("financial statements",)),
+    ("controls", ("controls and procedures",)),
+    ("legal_proceedings", ("legal proceedings",)),
+    ("business", ("business",)),
+    ("properties", ("properties",)),
+)
+
+_BLOCK_TAGS = {
+    "p", "div", "br", "tr", "li", "table", "h1", "h2", "h3", "h4", "h5", "h6",
+    "section", "article", "ul", "ol", "hr", "title",
+}
+_CELL_TAGS = {"td", "th"}
+_SKIP_TAGS = {"script", "style", "head"}
+_ITEM_RE = re.compile(r"^item\s*(\d{1,2}[a-c]?)\s*[.:\-–—]?\s*(.*)$", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+# A heading followed by less text than this before the next heading is a
+# table-of-contents entry, not the section itself.
+MIN_SECTION_CHARS = 400
+MAX_SECTION_CHARS = 250_000
+MAX_DOCUMENT_CHARS = 4_000_000
+
+
+def classify_heading(title: str) -> str:
+    lowered = title.lower().replace("’", "'")
+    for name, needles in SECTION_TITLES:
+        if any(needle.replace("’", "'") in lowered for needle in needles):
+            return name
+    return ""
+
+
+class FilingTextParser(HTMLParser):
+    """Incremental HTML-to-text converter that splits a filing into Items.
+
+    Feed it chunks as they arrive. When ``wanted`` is given, ``done`` turns
+    true as soon as every wanted section has been read in full, so the caller
+    can stop downloading.
+    """
+
+    def __init__(self, wanted: Optional[Iterable[str]] = None) -> None:
+        super().__init__(convert_charrefs=True)
+        self.wanted = set(wanted or ())
+        self.sections: dict[str, str] = {}
+        self.headings: dict[str, str] = {}
+        self.done = False
+        self.complete = False
+        self._skip_depth = 0
+        self._line: list[str] = []
+        self._document: list[str] = []
+        self._document_chars = 0
+        self._current = ""
+        self._current_heading = ""
+        self._current_parts: list[str] = []
+        self._current_chars = 0
+        self._pending_item = ""
+        # Without wanted sections the whole document is the result; with them
+        # only a bounded prefix is kept as a fallback for unparseable layouts.
+        self._document_cap = MAX_SECTION_CHARS if self.wanted else MAX_DOCUMENT_CHARS
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._flush_line()
+        elif tag in _CELL_TAGS:
+            self._line.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self.done:
+            self._line.append(data)
+
+    def close(self):
+        super().close()
+        self._flush_line()
+        self._close_section()
+        # ``done`` means the caller stopped early; otherwise every section in
+        # the document has been seen.
+        self.complete = not self.done
+
+    def _flush_line(self):
+        if not self._line:
+            return
+        line = _WS_RE.sub(" ", "".join(self._line)).strip()
+        self._line = []
+        if line and not self.done:
+            self._handle_line(line)
+
+    def _handle_line(self, line: str) -> None:
+        if self._document_chars < self._document_cap:
+            self._document.append(line)
+            self._document_chars += len(line) + 1
+
+        if self._pending_item:
+            item, self._pending_item = self._pending_item, ""
+            name = classify_heading(line)
+            if name:
+                self._open_section(name, f"Item {item}. {line}")
+                return
+
+        match = _ITEM_RE.match(line) if len(line) < 250 else None
+        if match:
+            item, title = match.group(1).upper(), match.group(2)
+            if not title:
+                self._pending_item = item
+                return
+            name = classify_heading(title)
+            if name:
+                self._open_section(name, line)
+                return
+
+        self._append(line)
+
+    def _open_section(self, name: str, heading: str) -> None:
+        self._close_section()
+        self._current = name
+        self._current_heading = heading
+        self._current_parts = []
+        self._current_chars = 0
+
+    def _append(self, line: str) -> None:
+        if self._current and self._current_chars < MAX_SECTION_CHARS:
+            self._current_parts.append(line)
+            self._current_chars += len(line) + 1
+
+    def _close_section(self) -> None:
+        name = self._current
+        if not name:
+            return
+        self._current = ""
+        if self._current_chars < MIN_SECTION_CHARS:
+            return
+        # Keep the longest body when a title repeats (10-Q Part I/Part II).
+        body = " ".join(self._current_parts)
+        if len(body) > len(self.sections.get(name, "")):
+            self.sections[name] = body
+            self.headings[name] = self._current_heading
+        if self.wanted and self.wanted.issubset(self.sections):
+            self.done = True
+
+    @property
+    def document_complete(self) -> bool:
+        return self.complete and self._document_chars < self._document_cap
+
+    def document(self) -> str:
+        return " ".join(self._document).strip()
+
+
+def parse_filing_stream(
+    chunks: Iterable[bytes],
+    encoding: Optional[str] = None,
+    wanted: Optional[Iterable[str]] = None,
+) -> FilingTextParser:
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    parser = FilingTextParser(wanted)
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser
+
+
+async def aparse_filing_stream(
+    chunks: AsyncIterable[bytes],
+    encoding: Optional[str] = None,
+    wanted: Optional[Iterable[str]] = None,
+) -> FilingTextParser:
+    """Async :func:`parse_filing_stream`.
+
+    Each chunk is parsed on a worker thread: a large filing is seconds of
+    HTML parsing, which would otherwise stall every request on the loop.
+    """
+    import asyncio
+
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    parser = FilingTextParser(wanted)
+    async for chunk in chunks:
+        await asyncio.to_thread(parser.feed, decoder.decode(chunk))
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser
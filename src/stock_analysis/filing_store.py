@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from typing import Optional
+
+_ACCESSION_RE = re.compile(r"^\d{10}-\d{2}-\d{6}$")
+_ACCESSION_PATH_RE = re.compile(r"/Archives/edgar/data/\d+/(\d{18})/")
+
+
+def filing_key(url_or_accession: str) -> str:
+    """Return a stable key for a filing: its accession number when known."""
+    value = (url_or_accession or "").strip()
+    if _ACCESSION_RE.match(value):
+        return value
+    match = _ACCESSION_PATH_RE.search(value)
+    if match:
+        digits = match.group(1)
+        return f"{digits[:10]}-{digits[10:12]}-{digits[12:]}"
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class FilingStore:
+    """Size-bounded on-disk store of compressed, normalized filing text.
+
+    Filed documents never change, so entries never expire; the least recently
+    used ones are evicted once the directory grows past ``max_bytes``. Writes
+    go through a temp file and ``os.replace`` so several worker processes can
+    share one directory.
+    """
+
+    _suffix = ".txt.z"
+    # Writes from other processes only show up in the running total when the
+    # directory is walked, so it is re-walked at least this often.
+    _rescan_seconds = 300.0
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = 0
+        self._scanned_at: Optional[float] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + self._suffix)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)
+            return zlib.decompress(data).decode("utf-8")
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        data = zlib.compress(text.encode("utf-8"), 6)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError:
+            return
+        # A running total keeps puts from walking the whole store; the walk
+        # happens only once it is over the limit or has gone stale.
+        with self._lock:
+            self._size += len(data) - replaced
+            due = (
+                self._size > self.max_bytes
+                or self._scanned_at is None
+                or time.monotonic() - self._scanned_at > self._rescan_seconds
+            )
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if not name.endswith(self._suffix):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            self._scanned_at = time.monotonic()
+            if total > self.max_bytes:
+                # Evict a little below the limit so the next walk is a while
+                # off instead of due on the next put.
+                target = self.max_bytes * 0.9
+                entries.sort()
+                for _, size, path in entries:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    if total <= target:
+                        break
+            self._size = total
+
+
+_store: Optional[FilingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_filing_store() -> Optional[FilingStore]:
+    """Return the process-wide filing store, or None when it is disabled."""
+    global _store
+    if os.getenv("FILING_CACHE", "true").strip().lower() in {"0", "false", "no"}:
+        return None
+    with _store_lock:
+        if _store is None:
+            root = os.getenv("FILING_CACHE_DIR", "").strip() or os.path.join(
+                tempfile.gettempdir(), "stock_analysis", "filings"
+            )
+            max_mb = float(os.getenv("FILING_CACHE_MAX_MB", "512"))
+            try:
+                _store = FilingStore(root, int(max_mb * 1024 * 1024))
+            except OSError:
+                return None
+        return _store
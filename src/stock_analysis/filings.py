@@ -0,0 +1,404 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+try:
+    from . import telemetry, transport
+    from .cache import TTLCache
+    from .filing_index import FilingIndex
+    from .filing_parser import (
+        SECTION_TITLES,
+        aparse_filing_stream,
+        classify_heading,
+        parse_filing_stream,
+    )
+    from .filing_store import filing_key, get_filing_store
+except ImportError:
+    import telemetry
+    import transport
+    from cache import TTLCache
+    from filing_index import FilingIndex
+    from filing_parser import (
+        SECTION_TITLES,
+        aparse_filing_stream,
+        classify_heading,
+        parse_filing_stream,
+    )
+    from filing_store import filing_key, get_filing_store
+
+SEC_HEADERS = {
+    "User-Agent": "stock-analysis-crew-ai contact@example.com",
+    "Accept-Encoding": "gzip, deflate",
+    "Host": "www.sec.gov",
+}
+SEC_API_QUERY_URL = "https://api.sec-api.io"
+
+
+# "Item 7" in a 10-K and Part I "Item 2" in a 10-Q are both MD&A, so items
+# are resolved per form to the parser's canonical section names.
+ITEM_SECTIONS = {
+    "10-K": {
+        "1": "business",
+        "1A": "risk_factors",
+        "2": "properties",
+        "3": "legal_proceedings",
+        "7": "mdna",
+        "7A": "market_risk",
+        "8": "financial_statements",
+        "9A": "controls",
+    },
+    "10-Q": {
+        "1": "financial_statements",
+        "1A": "risk_factors",
+        "2": "mdna",
+        "3": "market_risk",
+        "4": "controls",
+    },
+}
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+_ITEM_LABEL_RE = re.compile(r"^(?:item\s*)?(\d{1,2}[a-c]?)\b", re.IGNORECASE)
+_QUERY_SECTIONS = (
+    ("risk_factors", ("risk factor", "risks")),
+    ("mdna", ("md&a", "management", "liquidity", "guidance", "outlook", "cash flow", "results of operations")),
+    ("market_risk", ("market risk", "interest rate", "currency", "hedg")),
+    ("financial_statements", ("balance sheet", "income statement", "financial statement", "footnote")),
+    ("legal_proceedings", ("legal", "litigation", "lawsuit")),
+)
+
+
+def resolve_sections(label: str, form_type: str = "10-K") -> tuple[str, ...]:
+    """Map "Item 7", "item_1a", "mdna" or "Risk Factors" to section names."""
+    label = (label or "").strip()
+    if not label:
+        return ()
+    match = _ITEM_LABEL_RE.match(label.replace("_", " "))
+    items = ITEM_SECTIONS.get(form_type, ITEM_SECTIONS["10-K"])
+    if match and match.group(1).upper() in items:
+        return (items[match.group(1).upper()],)
+    name = label.lower().replace(" ", "_")
+    if any(name == section for section, _ in SECTION_TITLES):
+        return (name,)
+    classified = classify_heading(label)
+    return (classified,) if classified else sections_for_query(label)
+
+
+def sections_for_query(query: str) -> tuple[str, ...]:
+    lowered = (query or "").lower()
+    return tuple(
+        name
+        for name, needles in _QUERY_SECTIONS
+        if any(needle in lowered for needle in needles)
+    )
+
+
+class Filing:
+    """One SEC filing, split into its standard Items.
+
+    Sections are stored separately in the filing store and read lazily, so a
+    caller that needs only MD&A never loads or scans the rest. A download is
+    made only when a requested section has not been captured yet; it stops as
+    soon as the missing sections have been read.
+    """
+
+    def __init__(
+        self, url: str, accession_no: str = "", form_type: str = "", filed_at: str = ""
+    ) -> None:
+        self.url = url
+        self.accession_no = accession_no
+        self.form_type = form_type
+        self.filed_at = filed_at
+        self.key = filing_key(accession_no or url)
+        self._store = get_filing_store()
+        self._manifest: Optional[dict] = None
+        self._bodies: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_metadata(cls, filing: dict, form_type: str = "") -> Optional["Filing"]:
+        url = filing.get("linkToFilingDetails", "")
+        if not url:
+            return None
+        return cls(
+            url,
+            accession_no=filing.get("accessionNo", ""),
+            form_type=form_type or filing.get("formType", ""),
+            filed_at=filing.get("filedAt", "N/A"),
+        )
+
+    def _read(self, name: str) -> Optional[str]:
+        if name in self._bodies:
+            return self._bodies[name]
+        if self._store is None:
+            return None
+        text = self._store.get(f"{self.key}/{name}")
+        if text is not None:
+            self._bodies[name] = text
+        return text
+
+    def _write(self, name: str, text: str) -> None:
+        self._bodies[name] = text
+        if self._store is not None:
+            self._store.put(f"{self.key}/{name}", text)
+
+    def _manifest_covers(self, sections: tuple[str, ...]) -> bool:
+        manifest = self._manifest
+        if manifest is None:
+            try:
+                manifest = self._manifest = json.loads(self._read("manifest") or "null")
+            except ValueError:
+                manifest = None
+        if manifest is None:
+            return False
+        listed = manifest.get("sections", {})
+        if not sections:
+            covered, needed = manifest.get("document", False), ("document",)
+        else:
+            covered = manifest.get("complete", False) or set(sections).issubset(listed)
+            needed = tuple(name for name in sections if name in listed)
+        if not covered:
+            return False
+        # The store evicts bodies one file at a time, so the manifest can
+        # outlive them. A missing body is a miss: forget it and download again.
+        missing = [name for name in needed if self._read(name) is None]
+        if not missing:
+            return True
+        for name in missing:
+            if name == "document":
+                manifest["document"] = False
+            else:
+                listed.pop(name, None)
+        manifest["complete"] = False
+        return False
+
+    @telemetry.timed("filing.download")
+    def _download(self, sections: tuple[str, ...]) -> None:
+        resp = transport.get(self.url, headers=SEC_HEADERS, timeout=30, stream=True)
+        try:
+            resp.raise_for_status()
+            parser = parse_filing_stream(
+                resp.iter_content(chunk_size=64 * 1024),
+                encoding=_charset(resp.headers.get("Content-Type", "")),
+                wanted=sections,
+            )
+        finally:
+            # Closing early drops the rest of the body once the sections are in.
+            transport.finish(resp)
+        self._save(parser)
+
+    @telemetry.timed("filing.download")
+    async def _adownload(self, sections: tuple[str, ...]) -> None:
+        import asyncio
+
+        async with transport.astream("GET", self.url, headers=SEC_HEADERS, timeout=30) as resp:
+            resp.raise_for_status()
+            parser = await aparse_filing_stream(
+                resp.aiter_bytes(64 * 1024),
+                encoding=_charset(resp.headers.get("Content-Type", "")),
+                wanted=sections,
+            )
+        await asyncio.to_thread(self._save, parser)
+
+    def _save(self, parser) -> None:
+        manifest = self._manifest or {"sections": {}, "complete": False, "document": False}
+        for name, body in parser.sections.items():
+            self._write(name, body)
+            manifest["sections"][name] = parser.headings[name]
+        manifest["complete"] = manifest["complete"] or parser.complete
+        # Without wanted sections the parser keeps the whole document. With
+        # them it keeps only a bounded prefix, which is the whole document
+        # only for short filings whose Item headings couldn't be found.
+        if parser.document_complete:
+            self._write("document", parser.document())
+            manifest["document"] = True
+        self._manifest = manifest
+        self._write("manifest", json.dumps(manifest))
+
+    def load(self, sections: Iterable[str] = ()) -> bool:
+        sections = tuple(sorted(sections))
+        with self._lock:
+            if self._manifest_covers(sections):
+                return True
+            try:
+                self._download(sections)
+            except Exception:
+                return False
+            return True
+
+    async def aload(self, sections: Iterable[str] = ()) -> bool:
+        """Async :meth:`load`, without the per-filing lock: a ``Filing`` is
+        only shared across threads on the sync path."""
+        import asyncio
+
+        sections = tuple(sorted(sections))
+        if await asyncio.to_thread(self._manifest_covers, sections):
+            return True
+        try:
+            await self._adownload(sections)
+        except Exception:
+            return False
+        return True
+
+    def section_names(self) -> list[str]:
+        return list((self._manifest or {}).get("sections", {}))
+
+    def section(self, name: str) -> Optional[str]:
+        if not self.load((name,)):
+            return None
+        heading = self._manifest["sections"].get(name)
+        body = self._read(name) if heading else None
+        return f"{heading} {body}" if body else None
+
+    def text(self, sections: Iterable[str] = ()) -> Optional[str]:
+        """Text of the named sections, or the whole document when none match."""
+        sections = tuple(sorted(sections))
+        if not self.load(sections):
+            return None
+        parts = [part for part in (self.section(name) for name in sections) if part]
+        if parts:
+            return " ".join(parts)
+        # None of the sections exist; fall back to the full document.
+        if sections and not self.load():
+            return None
+        return self._read("document") or None
+
+
+_indexes: OrderedDict = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _charset(content_type: str) -> str:
+    # requests assumes ISO-8859-1 when no charset is sent; EDGAR HTML is
+    # UTF-8 or ASCII in practice.
+    match = _CHARSET_RE.search(content_type)
+    return match.group(1) if match else "utf-8"
+
+
+def _cached_index(key: tuple) -> Optional[FilingIndex]:
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+        return index
+
+
+def filing_index(filing: Filing, sections: Iterable[str] = ()) -> Optional[FilingIndex]:
+    """Return a search index over the filing's sections, built once per process.
+
+    Recently used indexes stay in memory, so repeated queries against the
+    same filing skip both the store read and the tokenization.
+    """
+    sections = tuple(sorted(sections))
+    key = (filing.key, sections)
+    with telemetry.span("filing.index") as span:
+        index = _cached_index(key)
+        span.set("cache", "hit" if index is not None else "miss")
+        if index is not None:
+            return index
+        text = filing.text(sections)
+        if not text:
+            return None
+        index = FilingIndex(text)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > int(os.getenv("FILING_INDEX_MAX", "16")):
+            _indexes.popitem(last=False)
+    return index
+
+
+async def afiling_index(filing: Filing, sections: Iterable[str] = ()) -> Optional[FilingIndex]:
+    """Async :func:`filing_index`: the download is async, tokenizing runs on a
+    worker thread."""
+    import asyncio
+
+    sections = tuple(sorted(sections))
+    if _cached_index((filing.key, sections)) is None and not await filing.aload(sections):
+        return None
+    return await asyncio.to_thread(filing_index, filing, sections)
+
+
+_metadata_cache: Optional[TTLCache] = None
+_metadata_lock = threading.Lock()
+
+
+def filing_metadata_cache() -> TTLCache:
+    global _metadata_cache
+    with _metadata_lock:
+        if _metadata_cache is None:
+            _metadata_cache = TTLCache(
+                ttl=float(os.getenv("FILING_META_TTL", "3600")),
+                max_entries=int(os.getenv("FILING_META_MAX_ENTRIES", "2048")),
+                shared_dir=os.getenv("FILING_META_CACHE_DIR", "").strip(),
+            )
+        return _metadata_cache
+
+
+def _query_headers(api_key: str) -> dict:
+    # The key goes in a header rather than a ``?token=`` parameter so it stays
+    # out of URLs, and with them out of error messages, logs and spans.
+    return {"Authorization": api_key}
+
+
+def _latest_filing_query(ticker: str, form_type: str) -> dict:
+    return {
+        "query": {
+            "query_string": {
+                "query": f'ticker:{ticker} AND formType:"{form_type}"'
+            }
+        },
+        "from": "0",
+        "size": "1",
+        "sort": [{"filedAt": {"order": "desc"}}],
+    }
+
+
+@telemetry.timed("sec_api.query")
+def _query_latest_filing(ticker: str, form_type: str, api_key: str) -> Optional[dict]:
+    # sec-api's query endpoint is a single JSON POST; going through the shared
+    # transport gives it keep-alive, a timeout and retries.
+    resp = transport.post(
+        SEC_API_QUERY_URL,
+        json=_latest_filing_query(ticker, form_type),
+        headers=_query_headers(api_key),
+        timeout=20,
+    )
+    resp.raise_for_status()
+    filings = resp.json().get("filings", [])
+    return filings[0] if filings else None
+
+
+@telemetry.timed("sec_api.query")
+async def _aquery_latest_filing(ticker: str, form_type: str, api_key: str) -> Optional[dict]:
+    resp = await transport.apost(
+        SEC_API_QUERY_URL,
+        json=_latest_filing_query(ticker, form_type),
+        headers=_query_headers(api_key),
+        timeout=20,
+    )
+    resp.raise_for_status()
+    filings = resp.json().get("filings", [])
+    return filings[0] if filings else None
+
+
+def latest_filing(ticker: str, form_type: str, api_key: str) -> Optional[dict]:
+    ticker = ticker.upper()
+    with telemetry.span("filing.metadata"):
+        try:
+            return filing_metadata_cache().get_or_load(
+                (ticker, form_type), lambda: _query_latest_filing(ticker, form_type, api_key)
+            )
+        except Exception:
+            return None
+
+
+async def alatest_filing(ticker: str, form_type: str, api_key: str) -> Optional[dict]:
+    ticker = ticker.upper()
+    with telemetry.span("filing.metadata"):
+        try:
+            return await filing_metadata_cache().aget_or_load(
+                (ticker, form_type), lambda: _aquery_latest_filing(ticker, form_type, api_key)
+            )
+        except Exception:
+            return None
@@ -0,0 +1,204 @@
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, Optional
+
+try:
+    from .service import run_analysis
+except ImportError:
+    from service import run_analysis
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ticker_status ON jobs (ticker, status);
+"""
+# Added after the first release; older databases get them on open.
+_LEASE_COLUMNS = (("owner", "TEXT"), ("heartbeat", "REAL"))
+
+
+def _lease_seconds() -> float:
+    return float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+
+@contextmanager
+def _connect(db_path: str) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _update(
+    db_path: str, job_id: str, where_status: str = "", where_owner: str = "", **fields
+) -> bool:
+    fields["updated_at"] = time.time()
+    columns = ", ".join(f"{name} = ?" for name in fields)
+    query = f"UPDATE jobs SET {columns} WHERE id = ?"
+    params = [*fields.values(), job_id]
+    if where_status:
+        query += " AND status = ?"
+        params.append(where_status)
+    if where_owner:
+        query += " AND owner = ?"
+        params.append(where_owner)
+    with _connect(db_path) as conn:
+        return conn.execute(query, params).rowcount > 0
+
+
+def _heartbeat(db_path: str, job_id: str, owner: str, stop: threading.Event) -> None:
+    while not stop.wait(_lease_seconds() / 3):
+        if not _update(
+            db_path, job_id, where_status="running", where_owner=owner, heartbeat=time.time()
+        ):
+            return
+
+
+def _execute(db_path: str, job_id: str, ticker: str) -> None:
+    # Module-level so process workers can unpickle it; every worker writes
+    # its own status updates straight to the store. Claiming the job with a
+    # conditional update keeps two server processes that both resumed it
+    # from running it twice, and the heartbeat keeps the lease on it alive
+    # so no other process reclaims it while it runs.
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    if not _update(
+        db_path, job_id, where_status="queued", status="running", owner=owner, heartbeat=time.time()
+    ):
+        return
+    stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(db_path, job_id, owner, stop), name="job-heartbeat", daemon=True
+    ).start()
+    try:
+        report = run_analysis(ticker)
+    except Exception as exc:
+        fields = {"status": "failed", "error": str(exc)}
+    else:
+        fields = {"status": "done", "result": str(report)}
+    finally:
+        stop.set()
+    # A run whose lease expired and was reclaimed leaves the row to the new owner.
+    _update(db_path, job_id, where_status="running", where_owner=owner, **fields)
+
+
+def _reclaim(conn: sqlite3.Connection, job_id: str) -> bool:
+    """Requeue a running job whose lease lapsed; only one process wins."""
+    return (
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'running' "
+            "AND (heartbeat IS NULL OR heartbeat < ?)",
+            (time.time(), job_id, time.time() - _lease_seconds()),
+        ).rowcount
+        > 0
+    )
+
+
+class JobQueue:
+    """Runs analyses in the background and records them in SQLite.
+
+    Jobs left queued by a previous process, or running under a lease nobody
+    has renewed for ``JOB_LEASE_SECONDS``, are re-dispatched on start-up;
+    jobs another live process is running are left alone. Submitting a ticker that already has an active job returns that
+    job instead of starting another.
+    """
+
+    def __init__(self, db_path: str, workers: int = 4, mode: str = "thread") -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with _connect(db_path) as conn:
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in _LEASE_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=workers)
+            if mode == "process"
+            else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        )
+        self._resume()
+
+    def _resume(self) -> None:
+        with _connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT id, ticker, status FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES,
+            ).fetchall()
+            rows = [row for row in rows if row["status"] != "running" or _reclaim(conn, row["id"])]
+        for row in rows:
+            # Queued jobs may also sit in another process's executor; the
+            # claim in _execute lets only one of them run it.
+            self._executor.submit(_execute, self.db_path, row["id"], row["ticker"])
+
+    def submit(self, ticker: str) -> dict:
+        with self._lock:
+            with _connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE ticker = ? AND status IN (?, ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (ticker, *ACTIVE_STATUSES),
+                ).fetchone()
+                if row is not None:
+                    # A job whose worker died keeps its "running" row; take it
+                    # over here rather than deduplicating onto it until the
+                    # next restart.
+                    if row["status"] != "running" or not _reclaim(conn, row["id"]):
+                        return dict(row)
+                    job_id = row["id"]
+                else:
+                    job_id = uuid.uuid4().hex
+                    now = time.time()
+                    conn.execute(
+                        "INSERT INTO jobs (id, ticker, status, created_at, updated_at) "
+                        "VALUES (?, ?, 'queued', ?, ?)",
+                        (job_id, ticker, now, now),
+                    )
+            self._executor.submit(_execute, self.db_path, job_id, ticker)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with _connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            db_path = os.getenv("JOB_DB_PATH", "").strip() or os.path.join(
+                tempfile.gettempdir(), "stock_analysis", "jobs.sqlite3"
+            )
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            _queue = JobQueue(
+                db_path,
+                workers=int(os.getenv("JOB_WORKERS", "4")),
+                mode=os.getenv("JOB_WORKER_MODE", "thread").strip().lower(),
+            )
+        return _queue
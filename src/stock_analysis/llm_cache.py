@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    from .cache import TTLCache
+except ImportError:
+    from cache import TTLCache
+
+_TIMESTAMP_RE = re.compile(r"^Timestamp:.*$", re.MULTILINE)
+_BLOCK_SPLIT_RE = re.compile(r"\n\s*\n")
+_WORD_RE = re.compile(r"\w+")
+
+# Request fields that change the answer. Everything else (stream, user ids)
+# is ignored when keying.
+_KEYED_PARAMS = ("model", "temperature", "max_tokens", "top_p", "stop", "seed")
+
+
+def canonical_prompt(text: str) -> str:
+    """Prompt text with volatile detail removed, for keying only.
+
+    Drops the ``Timestamp:`` line, collapses whitespace and case, and sorts
+    bulleted lines within each block, so the same headlines in a different
+    order produce the same key.
+    """
+    blocks = []
+    for block in _BLOCK_SPLIT_RE.split(_TIMESTAMP_RE.sub("", text)):
+        lines = [" ".join(line.split()).lower() for line in block.splitlines()]
+        lines = [line for line in lines if line]
+        bullets = sorted(line for line in lines if line.startswith("- "))
+        others = [line for line in lines if not line.startswith("- ")]
+        if others or bullets:
+            blocks.append("\n".join(others + bullets))
+    return "\n\n".join(blocks)
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """Charikar SimHash over word trigrams; similar texts differ in few bits."""
+    words = _WORD_RE.findall(text.lower())
+    shingles = [" ".join(words[i : i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Chat completions keyed on endpoint, parameters and canonicalized prompt.
+
+    The scope of a request is everything except the body of its messages:
+    endpoint, sampling parameters, and the first line of each message (the
+    instructions and ticker). Inside one scope, an exact match on the
+    canonical prompt is a hit. With ``near_bits`` above zero, a prompt whose
+    SimHash is within that many bits of a cached one also counts as a hit.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        shared_dir: str = "",
+        near_bits: int = 0,
+        fingerprints_per_scope: int = 32,
+    ) -> None:
+        self.near_bits = near_bits
+        self.fingerprints_per_scope = fingerprints_per_scope
+        self._entries = TTLCache(ttl, max_entries, shared_dir)
+        self._fingerprints: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+    def _keys(self, url: str, payload: dict) -> tuple[str, str, str]:
+        messages = payload.get("messages", [])
+        scope = _digest(
+            {
+                "url": url,
+                "params": {name: payload.get(name) for name in _KEYED_PARAMS},
+                "messages": [
+                    (message.get("role"), str(message.get("content", "")).split("\n", 1)[0])
+                    for message in messages
+                ],
+            }
+        )
+        prompt = canonical_prompt(
+            "\n\n".join(str(message.get("content", "")) for message in messages)
+        )
+        return scope, _digest(prompt), prompt
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, url: str, payload: dict) -> Optional[str]:
+        scope, digest, prompt = self._keys(url, payload)
+        content = self._entries.get((scope, digest))
+        if content is not None:
+            self._count("exact_hits")
+            return content
+        if self.near_bits > 0:
+            fingerprint = simhash(prompt)
+            with self._lock:
+                candidates = list(self._fingerprints.get(scope, ()))
+            nearest = sorted(
+                (bin(fingerprint ^ other).count("1"), other_digest)
+                for other, other_digest in candidates
+            )
+            for distance, other_digest in nearest:
+                if distance > self.near_bits:
+                    break
+                content = self._entries.get((scope, other_digest))
+                if content is not None:
+                    self._count("near_hits")
+                    return content
+        self._count("misses")
+        return None
+
+    def set(self, url: str, payload: dict, content: str) -> None:
+        scope, digest, prompt = self._keys(url, payload)
+        self._entries.set((scope, digest), content)
+        if self.near_bits <= 0:
+            return
+        fingerprint = simhash(prompt)
+        with self._lock:
+            entries = self._fingerprints.setdefault(scope, [])
+            entries.append((fingerprint, digest))
+            del entries[: -self.fingerprints_per_scope]
+            self._fingerprints.move_to_end(scope)
+            while len(self._fingerprints) > self._entries.max_entries:
+                self._fingerprints.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        hits = counters["exact_hits"] + counters["near_hits"]
+        counters["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        counters["entries"] = self._entries.stats()["entries"]
+        return counters
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Return the process-wide completion cache, or None when it is disabled."""
+    global _cache
+    if os.getenv("LLM_CACHE", "true").strip().lower() in {"0", "false", "no"}:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache(
+                ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+                shared_dir=os.getenv("LLM_CACHE_DIR", "").strip(),
+                near_bits=int(os.getenv("LLM_CACHE_NEAR_BITS", "0")),
+            )
+        return _cache
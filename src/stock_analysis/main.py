@@ -1,9 +1,13 @@
-import sys
+import argparse
+import json
 import os
+import sys
 
 try:
+    from .batch import run_batch
     from .service import run_analysis
 except ImportError:
+    from batch import run_batch
     from service import run_analysis
 
 def run():
@@ -19,7 +23,34 @@ def train():
         print(run_analysis(ticker))
     except Exception as e:
         raise Exception(f"An error occurred while running analysis: {e}")
-    
+
+def batch():
+    """
+    Analyze a watchlist, printing one JSON line per ticker as it completes.
+    """
+    parser = argparse.ArgumentParser(description="Batch stock analysis")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--file", help="File with one ticker per line")
+    parser.add_argument("--checkpoint", default="", help="Resumable JSONL checkpoint file")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--llm-concurrency", type=int, default=0)
+    args = parser.parse_args(sys.argv[1:])
+
+    tickers = list(args.tickers)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as fh:
+            tickers.extend(line.split("#")[0].strip() for line in fh)
+    if not tickers:
+        parser.error("provide tickers or --file")
+
+    for record in run_batch(
+        tickers,
+        checkpoint=args.checkpoint,
+        max_workers=args.workers,
+        max_llm_calls=args.llm_concurrency,
+    ):
+        print(json.dumps(record), flush=True)
+
 if __name__ == "__main__":
     print("## Welcome to Stock Analysis Crew")
     print('-------------------------------')
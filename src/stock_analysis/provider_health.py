@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+
+class ProviderHealth:
+    """Circuit breaker fed by real traffic for one upstream provider.
+
+    After ``threshold`` consecutive failures the circuit opens and the
+    provider is skipped. Once ``cooldown`` seconds have passed, a single
+    trial request is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, name: str, threshold: int = 3, cooldown: float = 60.0) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = ""
+        self.latency_ewma = 0.0
+        self._opened_at = 0.0
+        self._trial_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._trial_at = None
+            # A trial that was routed but never reported back (the caller
+            # stopped at an earlier provider) expires after one cooldown.
+            if self.state == "half_open" and (
+                self._trial_at is None or now - self._trial_at >= self.cooldown
+            ):
+                self._trial_at = now
+                return True
+            return False
+
+    def record_success(self, latency: float = 0.0) -> None:
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.state = "closed"
+            self._trial_at = None
+            self.latency_ewma = (
+                latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+            )
+
+    def record_failure(self, error: str = "", trip: bool = False) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error[:200]
+            self._trial_at = None
+            if (
+                trip
+                or self.state == "half_open"
+                or self.consecutive_failures >= self.threshold
+            ):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def error_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "successes": self.successes,
+                "failures": self.failures,
+                "error_rate": round(self.error_rate(), 4),
+                "latency_ewma": round(self.latency_ewma, 3),
+                "last_error": self.last_error,
+            }
+
+
+class ProviderRegistry:
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._providers: dict[str, ProviderHealth] = {}
+        self._probed = False
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ProviderHealth:
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = ProviderHealth(name, self.threshold, self.cooldown)
+            return self._providers[name]
+
+    def route(self, names: Iterable[str]) -> list[str]:
+        """Providers whose circuit lets traffic through, in preference order."""
+        return [name for name in names if self.get(name).available()]
+
+    def call(self, name: str, fn: Callable, *args):
+        started = time.monotonic()
+        try:
+            result = fn(*args)
+        except Exception as exc:
+            # Rejected credentials won't fix themselves; open at once.
+            status = getattr(getattr(exc, "response", None), "status_code", None)
+            self.get(name).record_failure(str(exc), trip=status in (401, 403))
+            raise
+        self.get(name).record_success(time.monotonic() - started)
+        return result
+
+    def probe_once(self, probes: dict[str, Callable[[], None]]) -> None:
+        """Run each probe a single time per process, in a background thread."""
+        with self._lock:
+            if self._probed:
+                return
+            self._probed = True
+
+        def run() -> None:
+            for name, probe in probes.items():
+                try:
+                    self.call(name, probe)
+                except Exception:
+                    pass
+
+        threading.Thread(target=run, name="provider-probe", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: health.stats() for name, health in providers.items()}
+
+
+_registry: Optional[ProviderRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_provider_registry() -> ProviderRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ProviderRegistry(
+                threshold=int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "3")),
+                cooldown=float(os.getenv("PROVIDER_COOLDOWN", "60")),
+            )
+        return _registry
@@ -0,0 +1,220 @@
+import functools
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+try:
+    from .cache import TTLCache
+except ImportError:
+    from cache import TTLCache
+
+_TIMESTAMP_RE = re.compile(r"^Timestamp:.*$", re.MULTILINE)
+
+
+def context_digest(context: str) -> str:
+    """Hash of the assembled context, ignoring the volatile timestamp line."""
+    return hashlib.sha256(_TIMESTAMP_RE.sub("", context).encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """Finished reports keyed on ticker and model settings, with freshness tiers.
+
+    - Younger than ``fresh`` seconds: served as-is, nothing is fetched.
+    - Younger than ``stale`` seconds with ``swr`` on: served immediately
+      while a background refresh recomputes it.
+    - Otherwise the context is rebuilt. If it hashes the same as the cached
+      entry's context, the old report is reused without an LLM call. Entries
+      are kept for ``retain`` seconds for this check.
+    """
+
+    def __init__(
+        self,
+        fresh: float,
+        stale: float,
+        swr: bool = True,
+        retain: float = 86400,
+        max_entries: int = 512,
+        shared_dir: str = "",
+    ) -> None:
+        self.fresh = fresh
+        self.stale = max(stale, fresh)
+        self.swr = swr
+        self._entries = TTLCache(max(retain, self.stale), max_entries, shared_dir)
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self.counters = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "context_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def cached(self, key: Hashable, refresh: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """Return a servable report, or None when it has to be recomputed."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry["created_at"]
+        if age <= self.fresh:
+            self._count("fresh_hits")
+            return entry["report"]
+        if self.swr and age <= self.stale:
+            self._count("stale_hits")
+            if refresh is not None:
+                self._refresh_in_background(key, refresh)
+            return entry["report"]
+        return None
+
+    def store(self, key: Hashable, context: str, report: str) -> None:
+        self._entries.set(
+            key,
+            {
+                "report": report,
+                "context_hash": context_digest(context),
+                "created_at": time.time(),
+            },
+        )
+
+    def reusable(self, key: Hashable, context: str) -> Optional[str]:
+        """Return the cached report if it was built from the same context."""
+        entry = self._entries.get(key)
+        if entry is not None and entry["context_hash"] == context_digest(context):
+            self._count("context_hits")
+            self.store(key, context, entry["report"])
+            return entry["report"]
+        return None
+
+    def _refresh_in_background(self, key: Hashable, refresh: Callable[[], None]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.counters["refreshes"] += 1
+
+        def run() -> None:
+            try:
+                refresh()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="report-refresh", daemon=True).start()
+
+    def compute(
+        self,
+        key: Hashable,
+        build_context: Callable[[], str],
+        generate: Callable[[str], str],
+        fallback: Callable[[str, Exception], str],
+    ) -> str:
+        context = build_context()
+        report = self.reusable(key, context)
+        if report is not None:
+            return report
+        try:
+            report = generate(context)
+        except Exception as exc:
+            # Failed generations are returned but never cached.
+            return fallback(context, exc)
+        self.store(key, context, report)
+        return report
+
+    def serve(
+        self,
+        key: Hashable,
+        build_context: Callable[[], str],
+        generate: Callable[[str], str],
+        fallback: Callable[[str, Exception], str],
+    ) -> str:
+        compute = functools.partial(self.compute, key, build_context, generate, fallback)
+        report = self.cached(key, refresh=compute)
+        if report is not None:
+            return report
+        self._count("misses")
+        return compute()
+
+    async def acompute(
+        self,
+        key: Hashable,
+        build_context: Callable[[], Awaitable[str]],
+        generate: Callable[[str], Awaitable[str]],
+        fallback: Callable[[str, Exception], str],
+    ) -> str:
+        import asyncio
+
+        context = await build_context()
+        # With REPORT_CACHE_DIR set these read and write files; keep them off
+        # the loop.
+        report = await asyncio.to_thread(self.reusable, key, context)
+        if report is not None:
+            return report
+        try:
+            report = await generate(context)
+        except Exception as exc:
+            return fallback(context, exc)
+        await asyncio.to_thread(self.store, key, context, report)
+        return report
+
+    async def aserve(
+        self,
+        key: Hashable,
+        build_context: Callable[[], Awaitable[str]],
+        generate: Callable[[str], Awaitable[str]],
+        fallback: Callable[[str, Exception], str],
+    ) -> str:
+        """Async :meth:`serve`; a background refresh runs on the caller's loop."""
+        import asyncio
+
+        compute = functools.partial(self.acompute, key, build_context, generate, fallback)
+        loop = asyncio.get_running_loop()
+        report = await asyncio.to_thread(
+            self.cached,
+            key,
+            refresh=lambda: asyncio.run_coroutine_threadsafe(compute(), loop).result(),
+        )
+        if report is not None:
+            return report
+        self._count("misses")
+        return await compute()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters[name] for name in ("fresh_hits", "stale_hits", "misses"))
+        served = counters["fresh_hits"] + counters["stale_hits"]
+        counters["hit_rate"] = round(served / lookups, 4) if lookups else 0.0
+        counters["entries"] = self._entries.stats()["entries"]
+        return counters
+
+
+_cache: Optional[ReportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> Optional[ReportCache]:
+    """Return the process-wide report cache, or None when it is disabled."""
+    global _cache
+    if os.getenv("REPORT_CACHE", "true").strip().lower() in {"0", "false", "no"}:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReportCache(
+                fresh=float(os.getenv("REPORT_CACHE_FRESH", "300")),
+                stale=float(os.getenv("REPORT_CACHE_STALE", "3600")),
+                swr=os.getenv("REPORT_CACHE_SWR", "true").strip().lower()
+                in {"1", "true", "yes"},
+                retain=float(os.getenv("REPORT_CACHE_RETAIN", "86400")),
+                max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "512")),
+                shared_dir=os.getenv("REPORT_CACHE_DIR", "").strip(),
+            )
+        return _cache
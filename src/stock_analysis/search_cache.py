@@ -0,0 +1,43 @@
+import os
+import re
+import threading
+from typing import Optional
+
+try:
+    from .cache import TTLCache
+except ImportError:
+    from cache import TTLCache
+
+_TICKER_PREFIX_RE = re.compile(r"(?:\$|\b(?:nasdaq|nyse|amex)\s*:\s*)([a-z]{1,5})\b")
+_TOKEN_RE = re.compile(r"[a-z0-9&]+(?:\.[a-z]{1,2})?")
+
+
+def normalize_query(query: str) -> str:
+    """Collapse spellings of the same search query onto one cache key.
+
+    Case, punctuation, whitespace and ticker spellings ("$AMZN",
+    "NASDAQ:AMZN", "amzn.us") are ignored. Word order and every word are
+    kept, since those can change what the query asks.
+    """
+    text = _TICKER_PREFIX_RE.sub(r" \1 ", (query or "").lower())
+    tokens = [token.split(".")[0] for token in _TOKEN_RE.findall(text)]
+    return " ".join(token for token in tokens if token)
+
+
+_cache: Optional[TTLCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[TTLCache]:
+    """Return the process-wide search cache, or None when it is disabled."""
+    global _cache
+    if os.getenv("SEARCH_CACHE", "true").strip().lower() in {"0", "false", "no"}:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTLCache(
+                ttl=float(os.getenv("SEARCH_CACHE_TTL", "600")),
+                max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048")),
+                shared_dir=os.getenv("SEARCH_CACHE_DIR", "").strip(),
+            )
+        return _cache
@@ -1,115 +1,180 @@
+import json
 import os
-import re
-import xml.etree.ElementTree as ET
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Optional
-from urllib.parse import quote
+from typing import Callable, Iterator, Optional, Union
 
-import html2text
-import requests
-from sec_api import QueryApi
 from dotenv import load_dotenv
 
+try:
+    from . import telemetry, transport
+    from .feeds import afetch_feed, fetch_feed, format_item, google_news_url
+    from .context_budget import Section, assemble, dedupe_headlines, estimate_tokens, rank_headlines
+    from .filing_index import FilingIndex
+    from .llm_cache import get_completion_cache
+    from .filings import (
+        Filing,
+        afiling_index,
+        alatest_filing,
+        filing_index,
+        filing_metadata_cache,
+        latest_filing,
+    )
+    from .report_cache import get_report_cache
+    from .search_cache import get_search_cache, normalize_query
+except ImportError:
+    import telemetry
+    import transport
+    from feeds import afetch_feed, fetch_feed, format_item, google_news_url
+    from context_budget import Section, assemble, dedupe_headlines, estimate_tokens, rank_headlines
+    from filing_index import FilingIndex
+    from llm_cache import get_completion_cache
+    from filings import (
+        Filing,
+        afiling_index,
+        alatest_filing,
+        filing_index,
+        filing_metadata_cache,
+        latest_filing,
+    )
+    from report_cache import get_report_cache
+    from search_cache import get_search_cache, normalize_query
+
 load_dotenv()
 
 
-def _search_news(query: str, limit: int = 5) -> str:
+def _fetch_news(query: str, limit: int) -> list[dict]:
+    return fetch_feed(google_news_url(query), limit)
+
+
+def _news_items(query: str, limit: int = 5) -> Union[list[dict], str]:
     try:
-        rss_url = (
-            "https://news.google.com/rss/search?"
-            f"q={quote(query)}&hl=en-US&gl=US&ceid=US:en"
+        return _cached_news(query, limit)
+    except Exception as exc:
+        return _lookup_failed_message("news", exc)
+
+
+def _cached_news(query: str, limit: int) -> list[dict]:
+    cache = get_search_cache()
+    if cache is None:
+        return _fetch_news(query, limit)
+
+    with telemetry.span("news"):
+        # Failures raise out of the loader, so they are never cached.
+        return cache.get_or_load(
+            ("news_items", normalize_query(query), limit), lambda: _fetch_news(query, limit)
         )
-        resp = requests.get(rss_url, timeout=20)
-        resp.raise_for_status()
-        root = ET.fromstring(resp.text)
-        items = root.findall(".//item")[:limit]
-        if not items:
-            return "No recent news found."
-        lines = []
-        for item in items:
-            title = (item.findtext("title") or "").strip()
-            link = (item.findtext("link") or "").strip()
-            lines.append(f"- {title}\n  {link}")
-        return "\n".join(lines)
+
+
+async def _anews_items(query: str, limit: int = 5) -> Union[list[dict], str]:
+    try:
+        return await _acached_news(query, limit)
     except Exception as exc:
-        return f"News lookup failed: {exc}"
+        return _lookup_failed_message("news", exc)
+
+
+async def _acached_news(query: str, limit: int) -> list[dict]:
+    cache = get_search_cache()
+    if cache is None:
+        return await afetch_feed(google_news_url(query), limit)
+
+    with telemetry.span("news"):
+        return await cache.aget_or_load(
+            ("news_items", normalize_query(query), limit),
+            lambda: afetch_feed(google_news_url(query), limit),
+        )
 
 
 def _latest_filing(ticker: str, form_type: str, sec_api_key: str) -> Optional[dict]:
-    try:
-        query_api = QueryApi(api_key=sec_api_key)
-        query = {
-            "query": {
-                "query_string": {
-                    "query": f'ticker:{ticker} AND formType:"{form_type}"'
-                }
-            },
-            "from": "0",
-            "size": "1",
-            "sort": [{"filedAt": {"order": "desc"}}],
-        }
-        filings = query_api.get_filings(query).get("filings", [])
-        return filings[0] if filings else None
-    except Exception:
-        return None
+    return latest_filing(ticker, form_type, sec_api_key)
 
 
-def _filing_text(url: str) -> Optional[str]:
-    try:
-        headers = {
-            "User-Agent": "stock-analysis-crew-ai contact@example.com",
-            "Accept-Encoding": "gzip, deflate",
-            "Host": "www.sec.gov",
-        }
-        resp = requests.get(url, headers=headers, timeout=30)
-        resp.raise_for_status()
-        converter = html2text.HTML2Text()
-        converter.ignore_links = True
-        text = converter.handle(resp.text)
-        return re.sub(r"\s+", " ", text).strip()
-    except Exception:
-        return None
+# MD&A carries the liquidity, cash-flow and outlook discussion.
+FILING_CONTEXT_SECTIONS = ("mdna", "risk_factors")
 
 
-def _extract_snippet(text: str, query: str) -> str:
-    terms = [t.lower() for t in re.findall(r"[a-zA-Z0-9]{3,}", query)]
-    lower = text.lower()
-    first_idx = -1
-    for term in terms[:10]:
-        idx = lower.find(term)
-        if idx != -1:
-            first_idx = idx if first_idx == -1 else min(first_idx, idx)
-    if first_idx == -1:
-        return text[:1000]
-    start = max(0, first_idx - 250)
-    end = min(len(text), first_idx + 900)
-    return text[start:end]
+def _filing_passages(index: FilingIndex, query: str, k: int = 6) -> list[str]:
+    """Best-matching passages, best first; the context assembler trims the tail."""
+    passages = [index.text[start:end] for _, start, end in index.search(query, k)]
+    return passages or [index.text[:1200]]
 
 
-def _filing_context(ticker: str, form_type: str, search_query: str) -> str:
+def _filing_context(ticker: str, form_type: str, search_query: str):
     sec_api_key = os.getenv("SEC_API_API_KEY", "").strip()
     if not sec_api_key:
         return f"{form_type}: SEC_API_API_KEY missing."
 
-    filing = _latest_filing(ticker, form_type, sec_api_key)
-    if not filing:
+    metadata = _latest_filing(ticker, form_type, sec_api_key)
+    if not metadata:
         return f"{form_type}: no filing found."
 
-    filing_url = filing.get("linkToFilingDetails", "")
-    filed_at = filing.get("filedAt", "N/A")
-    if not filing_url:
+    filing = Filing.from_metadata(metadata, form_type)
+    if filing is None:
         return f"{form_type}: filing found but URL missing."
 
-    text = _filing_text(filing_url)
-    if not text:
+    index = filing_index(filing, FILING_CONTEXT_SECTIONS)
+    if index is None:
         return f"{form_type}: unable to fetch filing text."
+    return _filing_section(filing, index, search_query)
 
-    snippet = _extract_snippet(text, search_query)
-    return (
-        f"{form_type} filed at {filed_at}\n"
-        f"Source: {filing_url}\n"
-        f"Snippet:\n{snippet[:1200]}"
-    )
+
+async def _afiling_context(ticker: str, form_type: str, search_query: str):
+    sec_api_key = os.getenv("SEC_API_API_KEY", "").strip()
+    if not sec_api_key:
+        return f"{form_type}: SEC_API_API_KEY missing."
+
+    metadata = await alatest_filing(ticker, form_type, sec_api_key)
+    if not metadata:
+        return f"{form_type}: no filing found."
+
+    filing = Filing.from_metadata(metadata, form_type)
+    if filing is None:
+        return f"{form_type}: filing found but URL missing."
+
+    index = await afiling_index(filing, FILING_CONTEXT_SECTIONS)
+    if index is None:
+        return f"{form_type}: unable to fetch filing text."
+    return _filing_section(filing, index, search_query)
+
+
+def _filing_section(filing: Filing, index: FilingIndex, search_query: str) -> dict:
+    form_type = filing.form_type
+    return {
+        "header": (
+            f"{form_type} filed at {filing.filed_at}\n"
+            f"Source: {filing.url}\n"
+            "Snippets:"
+        ),
+        "units": _filing_passages(index, search_query),
+        "joiner": "\n...\n",
+    }
+
+
+def _metrics_module():
+    # Imported on first use so numpy loads with the first analysis, not at startup.
+    try:
+        from .tools import financial_metrics
+    except ImportError:
+        from tools import financial_metrics
+    return financial_metrics
+
+
+def _financials_context(ticker: str) -> dict:
+    return _financials_section(_metrics_module().financial_metrics([ticker])[ticker])
+
+
+async def _afinancials_context(ticker: str) -> dict:
+    return _financials_section((await _metrics_module().afinancial_metrics([ticker]))[ticker])
+
+
+def _financials_section(text: str) -> dict:
+    # Metric lines come most important first; the assembler trims the tail.
+    header, _, lines = text.partition("\n")
+    return {"header": header, "units": lines.splitlines(), "keep_order": True}
 
 
 def _llm_config() -> tuple[str, str, str]:
@@ -132,7 +197,7 @@ def _llm_config() -> tuple[str, str, str]:
     raise ValueError("Set GROQ_API_KEY or XAI_API_KEY.")
 
 
-def _generate_report(ticker: str, context: str) -> str:
+def _chat_request(ticker: str, context: str, stream: bool = False) -> tuple[str, dict, dict]:
     base_url, api_key, model = _llm_config()
     max_tokens = int(os.getenv("MAX_TOKENS", "450"))
     temperature = float(os.getenv("TEMPERATURE", "0.2"))
@@ -156,54 +221,492 @@ def _generate_report(ticker: str, context: str) -> str:
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    if stream:
+        payload["stream"] = True
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
+    return f"{base_url}/chat/completions", headers, payload
 
-    resp = requests.post(
-        f"{base_url}/chat/completions",
-        headers=headers,
-        json=payload,
-        timeout=90,
-    )
+
+@telemetry.timed("llm.generate")
+def generate_report(ticker: str, context: str) -> str:
+    url, headers, payload = _chat_request(ticker, context)
+    completions = get_completion_cache()
+    if completions is not None:
+        cached = completions.get(url, payload)
+        telemetry.record("cache", "miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+    resp = transport.post(url, headers=headers, json=payload, timeout=90)
     resp.raise_for_status()
-    data = resp.json()
-    return (
-        data.get("choices", [{}])[0]
-        .get("message", {})
-        .get("content", "")
-        .strip()
-        or "No content returned by model."
+    return _report_content(url, payload, resp.json())
+
+
+@telemetry.timed("llm.generate")
+async def agenerate_report(ticker: str, context: str) -> str:
+    import asyncio
+
+    url, headers, payload = _chat_request(ticker, context)
+    completions = get_completion_cache()
+    if completions is not None:
+        # LLM_CACHE_DIR lookups read from disk; keep them off the loop.
+        cached = await asyncio.to_thread(completions.get, url, payload)
+        telemetry.record("cache", "miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+    resp = await transport.apost(url, headers=headers, json=payload, timeout=90)
+    resp.raise_for_status()
+    return await asyncio.to_thread(_report_content, url, payload, resp.json())
+
+
+def _report_content(url: str, payload: dict, data: dict) -> str:
+    content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+    usage = data.get("usage") or {}
+    telemetry.add("prompt_tokens", usage.get("prompt_tokens") or _prompt_tokens(payload))
+    telemetry.add("completion_tokens", usage.get("completion_tokens") or estimate_tokens(content))
+    if not content:
+        return "No content returned by model."
+    completions = get_completion_cache()
+    if completions is not None:
+        completions.set(url, payload, content)
+    return content
+
+
+def _prompt_tokens(payload: dict) -> int:
+    return sum(estimate_tokens(str(message.get("content", ""))) for message in payload["messages"])
+
+
+def _stream_report(ticker: str, context: str) -> Iterator[str]:
+    """Yield content deltas from an OpenAI-compatible streaming completion."""
+    url, headers, payload = _chat_request(ticker, context, stream=True)
+    resp = transport.post(url, headers=headers, json=payload, timeout=90, stream=True)
+    try:
+        resp.raise_for_status()
+        resp.encoding = resp.encoding or "utf-8"
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+    finally:
+        transport.finish(resp)
+
+
+def _fetch_timeout_message(name: str, timeout: float) -> str:
+    if name in ("news", "earnings"):
+        return f"News lookup failed: timed out after {timeout:.0f}s"
+    return f"{name}: lookup timed out after {timeout:.0f}s."
+
+
+def _lookup_failed_message(name: str, exc: Exception) -> str:
+    if name in ("news", "earnings"):
+        return f"News lookup failed: {exc}"
+    return f"{name}: lookup failed: {exc}"
+
+
+def _context_sources(ticker: str) -> dict:
+    filing_query = "MD&A guidance risks cash flow liquidity outlook"
+    return {
+        "news": (_news_items, (f"{ticker} stock news market sentiment",)),
+        "earnings": (_news_items, (f"{ticker} earnings date guidance",)),
+        "financials": (_financials_context, (ticker,)),
+        "10-Q": (_filing_context, (ticker, "10-Q", filing_query)),
+        "10-K": (_filing_context, (ticker, "10-K", filing_query)),
+    }
+
+
+def _run_source(name: str, fn: Callable, *args):
+    with telemetry.span(f"context.{name}"):
+        return fn(*args)
+
+
+def _gather_context(
+    ticker: str, on_progress: Optional[Callable[[str], None]] = None
+) -> dict:
+    sources = _context_sources(ticker)
+    mode = os.getenv("CONTEXT_FETCH_MODE", "concurrent").strip().lower()
+    if mode == "sequential":
+        results = {}
+        for name, (fn, args) in sources.items():
+            try:
+                results[name] = _run_source(name, fn, *args)
+            except Exception as exc:
+                results[name] = _lookup_failed_message(name, exc)
+            if on_progress is not None:
+                on_progress(name)
+        return results
+
+    # Sources run at once and are collected in turn. Each wait is at most
+    # CONTEXT_SOURCE_TIMEOUT, and all of them stop at CONTEXT_TOTAL_TIMEOUT
+    # after the fan-out started, so latency is bounded by the slowest
+    # source within that.
+    total_timeout = float(os.getenv("CONTEXT_TOTAL_TIMEOUT", "45"))
+    source_timeout = float(os.getenv("CONTEXT_SOURCE_TIMEOUT", "35"))
+    started = time.monotonic()
+    deadline = started + total_timeout
+
+    executor = ThreadPoolExecutor(
+        max_workers=len(sources), thread_name_prefix="context-fetch"
     )
+    try:
+        futures = {
+            name: executor.submit(telemetry.propagate(_run_source), name, fn, *args)
+            for name, (fn, args) in sources.items()
+        }
+        if on_progress is not None:
+            for name, future in futures.items():
+                future.add_done_callback(lambda _, name=name: on_progress(name))
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(
+                    timeout=min(source_timeout, max(0.0, deadline - time.monotonic()))
+                )
+            except FutureTimeoutError:
+                future.cancel()
+                results[name] = _fetch_timeout_message(
+                    name, time.monotonic() - started
+                )
+            except Exception as exc:
+                results[name] = _lookup_failed_message(name, exc)
+        return results
+    finally:
+        # Don't block the response on stragglers; they finish on their own
+        # request timeouts.
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
-def run_analysis(ticker: str) -> str:
+# Async fetchers for the sources in _context_sources, by name.
+_ASYNC_SOURCES = {
+    "news": _anews_items,
+    "earnings": _anews_items,
+    "financials": _afinancials_context,
+    "10-Q": _afiling_context,
+    "10-K": _afiling_context,
+}
+
+
+async def _arun_source(name: str, fn: Callable, *args):
+    with telemetry.span(f"context.{name}"):
+        return await fn(*args)
+
+
+async def _agather_context(ticker: str) -> dict:
+    """Async :func:`_gather_context`. Sources that miss the deadline are
+    cancelled, which also stops their downloads."""
+    # Imported here, as in the other async paths: asyncio is a large share of
+    # the import time of the sync entry points, which never use it.
+    import asyncio
+
+    sources = {
+        name: (_ASYNC_SOURCES[name], args)
+        for name, (_, args) in _context_sources(ticker).items()
+    }
+    mode = os.getenv("CONTEXT_FETCH_MODE", "concurrent").strip().lower()
+    if mode == "sequential":
+        results = {}
+        for name, (fn, args) in sources.items():
+            try:
+                results[name] = await _arun_source(name, fn, *args)
+            except Exception as exc:
+                results[name] = _lookup_failed_message(name, exc)
+        return results
+
+    total_timeout = float(os.getenv("CONTEXT_TOTAL_TIMEOUT", "45"))
+    source_timeout = float(os.getenv("CONTEXT_SOURCE_TIMEOUT", "35"))
+    started = time.monotonic()
+    deadline = started + total_timeout
+    tasks = {
+        name: asyncio.create_task(_arun_source(name, fn, *args))
+        for name, (fn, args) in sources.items()
+    }
+    results = {}
+    for name, task in tasks.items():
+        if not task.done():
+            remaining = max(0.0, deadline - time.monotonic())
+            await asyncio.wait({task}, timeout=min(source_timeout, remaining))
+        if not task.done():
+            task.cancel()
+            results[name] = _fetch_timeout_message(name, time.monotonic() - started)
+        elif task.exception() is not None:
+            results[name] = _lookup_failed_message(name, task.exception())
+        else:
+            results[name] = task.result()
+    return results
+
+
+def normalize_ticker(ticker: str) -> str:
     ticker = (ticker or os.getenv("COMPANY_STOCK", "AMZN")).strip().upper()
     if not ticker:
         raise ValueError("Ticker is required.")
+    return ticker
+
+
+# Prompt tokens outside the context: system prompt and instructions.
+PROMPT_OVERHEAD_TOKENS = 120
+
+# Relative share of the token budget each context section gets.
+CONTEXT_SECTIONS = (
+    ("news", "Recent News", 1.0),
+    ("earnings", "Earnings/Catalysts", 0.8),
+    ("financials", "Reported Financials", 1.2),
+    ("10-Q", "10-Q Context", 1.2),
+    ("10-K", "10-K Context", 1.0),
+)
+
+
+def context_token_budget() -> int:
+    """Tokens available for context, bounded by the model's window."""
+    budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+    window = int(os.getenv("MODEL_CONTEXT_TOKENS", "8192"))
+    reserved = int(os.getenv("MAX_TOKENS", "450")) + PROMPT_OVERHEAD_TOKENS
+    return max(256, min(budget, window - reserved))
+
 
+def _context_section(title: str, value, weight: float, query: str) -> Section:
+    if isinstance(value, list):
+        # Headlines only: feed links cost ~50 tokens each and add no evidence.
+        units = [f"- {format_item(item)}" for item in rank_headlines(value, query)]
+        return Section(title, units or ["No recent news found."], weight=weight)
+    if isinstance(value, dict):
+        return Section(
+            title,
+            value["units"],
+            header=value["header"],
+            joiner=value.get("joiner", "\n"),
+            weight=weight,
+            keep_order=value.get("keep_order", False),
+        )
+    return Section(title, [str(value)], weight=weight)
+
+
+@telemetry.timed("context")
+def build_context(
+    ticker: str, on_progress: Optional[Callable[[str], None]] = None
+) -> str:
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-    news = _search_news(f"{ticker} stock news market sentiment")
-    earnings = _search_news(f"{ticker} earnings date guidance")
-    filing_query = "MD&A guidance risks cash flow liquidity outlook"
-    form_10q = _filing_context(ticker, "10-Q", filing_query)
-    form_10k = _filing_context(ticker, "10-K", filing_query)
+    return _render_context(ticker, now, _gather_context(ticker, on_progress))
+
 
-    context = (
+@telemetry.timed("context")
+async def abuild_context(ticker: str) -> str:
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    return _render_context(ticker, now, await _agather_context(ticker))
+
+
+def _render_context(ticker: str, now: str, fetched: dict) -> str:
+    # Both news queries often return the same stories; keep each once, in
+    # the section that asked for it first.
+    news = [name for name in ("news", "earnings") if isinstance(fetched[name], list)]
+    for name, items in zip(news, dedupe_headlines([fetched[name] for name in news])):
+        if fetched[name] and not items:
+            items = "No headlines beyond those listed above."
+        fetched[name] = items
+
+    sources = _context_sources(ticker)
+    sections = {
+        name: _context_section(title, fetched[name], weight, sources[name][1][-1])
+        for name, title, weight in CONTEXT_SECTIONS
+    }
+    return (
         f"Timestamp: {now}\n"
         f"Ticker: {ticker}\n\n"
-        f"Recent News:\n{news}\n\n"
-        f"Earnings/Catalysts:\n{earnings}\n\n"
-        f"10-Q Context:\n{form_10q}\n\n"
-        f"10-K Context:\n{form_10k}\n"
+        + assemble(sections, context_token_budget())
+    )
+
+
+def _fallback_report(context: str, exc: Exception) -> str:
+    return (
+        "LLM generation failed. Returning raw context.\n\n"
+        f"Reason: {exc}\n\n"
+        f"{context[:5000]}"
     )
 
+
+def complete_report(ticker: str, context: str) -> str:
     try:
-        return _generate_report(ticker, context)
+        return generate_report(ticker, context)
     except Exception as exc:
-        return (
-            "LLM generation failed. Returning raw context.\n\n"
-            f"Reason: {exc}\n\n"
-            f"{context[:5000]}"
+        return _fallback_report(context, exc)
+
+
+async def acomplete_report(ticker: str, context: str) -> str:
+    try:
+        return await agenerate_report(ticker, context)
+    except Exception as exc:
+        return _fallback_report(context, exc)
+
+
+def _report_cache_key(ticker: str) -> Optional[tuple]:
+    try:
+        base_url, _, model = _llm_config()
+    except ValueError:
+        return None
+    return (
+        ticker,
+        base_url,
+        model,
+        os.getenv("MAX_TOKENS", "450"),
+        os.getenv("TEMPERATURE", "0.2"),
+    )
+
+
+def cache_stats() -> dict:
+    reports = get_report_cache()
+    searches = get_search_cache()
+    completions = get_completion_cache()
+    return {
+        "reports": reports.stats() if reports is not None else None,
+        "completions": completions.stats() if completions is not None else None,
+        "searches": searches.stats() if searches is not None else None,
+        "filing_metadata": filing_metadata_cache().stats(),
+    }
+
+
+def _build_uncached(ticker: str) -> str:
+    telemetry.record("cache", "miss")
+    return build_context(ticker)
+
+
+def _report_steps(ticker: str) -> tuple:
+    return (
+        lambda: _build_uncached(ticker),
+        lambda context: generate_report(ticker, context),
+        _fallback_report,
+    )
+
+
+async def _abuild_uncached(ticker: str) -> str:
+    telemetry.record("cache", "miss")
+    return await abuild_context(ticker)
+
+
+def run_analysis(ticker: str) -> str:
+    ticker = normalize_ticker(ticker)
+    cache = get_report_cache()
+    key = _report_cache_key(ticker)
+    with telemetry.span("analysis") as current:
+        if cache is None or key is None:
+            return complete_report(ticker, build_context(ticker))
+        current.set("cache", "hit")
+        return cache.serve(key, *_report_steps(ticker))
+
+
+async def arun_analysis(ticker: str) -> str:
+    """Async :func:`run_analysis`: upstream calls share one event loop instead
+    of holding a thread each."""
+    ticker = normalize_ticker(ticker)
+    cache = get_report_cache()
+    key = _report_cache_key(ticker)
+    with telemetry.span("analysis") as current:
+        if cache is None or key is None:
+            return await acomplete_report(ticker, await abuild_context(ticker))
+        current.set("cache", "hit")
+        return await cache.aserve(
+            key,
+            lambda: _abuild_uncached(ticker),
+            lambda context: agenerate_report(ticker, context),
+            _fallback_report,
+        )
+
+
+def stream_analysis(ticker: str) -> Iterator[tuple[str, dict]]:
+    """Run an analysis as a sequence of ``(event, data)`` pairs.
+
+    Emits ``progress`` while context sources complete, then ``token`` for each
+    completion delta, and finally ``done``. If the model fails before
+    streaming anything, the raw-context fallback is sent as one ``report``.
+    """
+    ticker = normalize_ticker(ticker)
+    cache = get_report_cache()
+    key = _report_cache_key(ticker)
+    if cache is not None and key is not None:
+        cached = cache.cached(
+            key, refresh=lambda: cache.compute(key, *_report_steps(ticker))
+        )
+        if cached is not None:
+            yield "report", {"text": cached, "cached": True}
+            yield "done", {"ticker": ticker}
+            return
+
+    sources = list(_context_sources(ticker))
+    yield "progress", {"stage": "context", "ticker": ticker, "pending": sources}
+
+    events: queue.Queue = queue.Queue()
+    holder: dict = {}
+
+    def gather() -> None:
+        try:
+            holder["context"] = build_context(ticker, events.put)
+        except Exception as exc:
+            holder["error"] = exc
+        finally:
+            events.put(None)
+
+    threading.Thread(
+        target=telemetry.propagate(gather), name="stream-context", daemon=True
+    ).start()
+    while True:
+        source = events.get()
+        if source is None:
+            break
+        yield "progress", {"stage": "context", "source": source, "status": "done"}
+    if "error" in holder:
+        raise holder["error"]
+
+    context = holder["context"]
+    if cache is not None and key is not None:
+        reused = cache.reusable(key, context)
+        if reused is not None:
+            yield "report", {"text": reused, "cached": True}
+            yield "done", {"ticker": ticker}
+            return
+
+    completions = get_completion_cache()
+    url, _, payload = _chat_request(ticker, context, stream=True)
+    if completions is not None:
+        cached = completions.get(url, payload)
+        if cached is not None:
+            if cache is not None and key is not None:
+                cache.store(key, context, cached)
+            yield "report", {"text": cached, "cached": True}
+            yield "done", {"ticker": ticker}
+            return
+
+    yield "progress", {"stage": "llm"}
+    parts = []
+    started = time.perf_counter()
+    first_token = None
+    try:
+        for delta in _stream_report(ticker, context):
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            parts.append(delta)
+            yield "token", {"text": delta}
+    except Exception as exc:
+        if parts:
+            raise
+        yield "report", {"text": _fallback_report(context, exc)}
+    else:
+        # The stream spans many yields, so it is recorded after the fact
+        # rather than inside a span.
+        telemetry.observe(
+            "llm.stream",
+            started,
+            prompt_tokens=_prompt_tokens(payload),
+            completion_tokens=estimate_tokens("".join(parts)),
+            ttft_s=round(first_token or 0.0, 4),
         )
+        report = "".join(parts).strip()
+        if report and cache is not None and key is not None:
+            cache.store(key, context, report)
+        if report and completions is not None:
+            completions.set(url, payload, report)
+    yield "done", {"ticker": ticker}
@@ -0,0 +1,262 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Spans add to these attributes; anything else is kept on the span only.
+_COUNTED = ("bytes", "prompt_tokens", "completion_tokens")
+# Error text reaches clients through ``breakdown``; URLs can carry API keys.
+_URL_RE = re.compile(r"(\w+://[^/\s?#]+)[^\s'\"<>)]*")
+_QUERY_RE = re.compile(r"\?[^\s'\"<>)]*")
+
+
+class Span:
+    def __init__(self, stage: str, parent: Optional["Span"]) -> None:
+        self.stage = stage
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.attrs: dict = {}
+        self.error = ""
+
+    def add(self, name: str, value: int) -> None:
+        self.attrs[name] = self.attrs.get(name, 0) + value
+
+    def set(self, name: str, value) -> None:
+        self.attrs[name] = value
+
+    def to_dict(self, origin: float) -> dict:
+        data = {
+            "stage": self.stage,
+            "start_s": round(self.started - origin, 4),
+            "duration_s": round(self.duration, 4),
+            **self.attrs,
+        }
+        if self.parent is not None:
+            data["parent"] = self.parent.stage
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Process-wide aggregates of finished spans, by stage."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.durations: dict[str, _Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self.totals: dict[tuple[str, str], int] = {}
+        self.cache: dict[tuple[str, str], int] = {}
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            self.durations.setdefault(span.stage, _Histogram()).observe(span.duration)
+            if span.error:
+                self.errors[span.stage] = self.errors.get(span.stage, 0) + 1
+            for name in _COUNTED:
+                if span.attrs.get(name):
+                    key = (span.stage, name)
+                    self.totals[key] = self.totals.get(key, 0) + int(span.attrs[name])
+            if span.attrs.get("cache") in ("hit", "miss", "coalesced"):
+                key = (span.stage, span.attrs["cache"])
+                self.cache[key] = self.cache.get(key, 0) + 1
+
+    def prometheus(self, prefix: str = "stock_analysis") -> str:
+        """Render the aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            durations = {stage: (list(h.counts), h.sum, h.count) for stage, h in self.durations.items()}
+            errors = dict(self.errors)
+            totals = dict(self.totals)
+            cache = dict(self.cache)
+
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent in each pipeline stage.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        for stage, (counts, total, count) in sorted(durations.items()):
+            cumulative = 0
+            for bound, bucket in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(
+                    f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+        lines += [
+            f"# HELP {prefix}_stage_errors_total Stage runs that raised.",
+            f"# TYPE {prefix}_stage_errors_total counter",
+        ]
+        lines += [
+            f'{prefix}_stage_errors_total{{stage="{stage}"}} {value}'
+            for stage, value in sorted(errors.items())
+        ]
+        for name, help_text in (
+            ("bytes", "Response bytes fetched by each stage."),
+            ("prompt_tokens", "LLM prompt tokens by stage."),
+            ("completion_tokens", "LLM completion tokens by stage."),
+        ):
+            lines += [
+                f"# HELP {prefix}_{name}_total {help_text}",
+                f"# TYPE {prefix}_{name}_total counter",
+            ]
+            lines += [
+                f'{prefix}_{name}_total{{stage="{stage}"}} {value}'
+                for (stage, kind), value in sorted(totals.items())
+                if kind == name
+            ]
+        lines += [
+            f"# HELP {prefix}_cache_lookups_total Cache lookups by stage and result.",
+            f"# TYPE {prefix}_cache_lookups_total counter",
+        ]
+        lines += [
+            f'{prefix}_cache_lookups_total{{stage="{stage}",result="{result}"}} {value}'
+            for (stage, result), value in sorted(cache.items())
+        ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+_trace: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[Span]:
+    """Time a stage; exceptions are recorded on the span and re-raised."""
+    current = Span(stage, _current.get())
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = _describe(exc)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _current.reset(token)
+        _finish(current)
+
+
+def _describe(exc: BaseException) -> str:
+    """Exception type plus the HTTP status or the message, minus URL paths
+    and query strings."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return f"{type(exc).__name__}: {status}"
+    # urllib3 reports the path alone ("with url: /?token=..."), so query
+    # strings are dropped wherever they appear.
+    message = _QUERY_RE.sub("", _URL_RE.sub(r"\1", str(exc)))
+    return f"{type(exc).__name__}: {message}"[:200]
+
+
+def _finish(current: Span) -> None:
+    registry.observe(current)
+    spans = _trace.get()
+    if spans is not None:
+        spans.append(current)
+
+
+def observe(stage: str, started: float, **attrs) -> Span:
+    """Record a stage that ran from ``started`` (a ``perf_counter`` value) to now.
+
+    For work that can't sit inside a ``with`` block, such as a completion
+    streamed across a generator's yields.
+    """
+    current = Span(stage, _current.get())
+    current.started = started
+    current.duration = time.perf_counter() - started
+    current.attrs.update(attrs)
+    _finish(current)
+    return current
+
+
+def timed(stage: str) -> Callable:
+    """Decorator form of :func:`span`."""
+
+    def decorate(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record(name: str, value) -> None:
+    """Set an attribute on the innermost open span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.set(name, value)
+
+
+def add(name: str, value: int) -> None:
+    """Add to a counted attribute (bytes, tokens) of the innermost open span."""
+    current = _current.get()
+    if current is not None:
+        current.add(name, value)
+
+
+@contextmanager
+def trace() -> Iterator[list]:
+    """Collect every span finished in this context (and tasks copied from it).
+
+    Yields a list that fills in as spans finish; use :func:`breakdown` on it
+    once the traced work is done.
+    """
+    spans: list = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+def breakdown(spans: list) -> dict:
+    if not spans:
+        return {"total_s": 0.0, "spans": []}
+    origin = min(span.started for span in spans)
+    end = max(span.started + span.duration for span in spans)
+    ordered = sorted(spans, key=lambda span: span.started)
+    return {
+        "total_s": round(end - origin, 4),
+        "spans": [span.to_dict(origin) for span in ordered],
+    }
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind ``fn`` to the caller's context so spans in a worker thread nest
+    under the caller's span and land in its trace."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
@@ -1,57 +1,187 @@
 import ast
-import operator
+import functools
+import json
+import os
 import re
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+try:
+    from .. import telemetry
+except ImportError:
+    import telemetry
+
+MAX_EXPRESSION_CHARS = 500
+MAX_DEPTH = 32
+MAX_EXPONENT = 1024
+
+_ALLOWED_RE = re.compile(r"^[0-9A-Za-z_+\-*/().% ]+$")
+_OPERATOR_SPACE_RE = re.compile(r"\s*([-+*/%()])\s*")
+_ASSIGN_RE = re.compile(r"^([A-Za-z_]\w*)\s*=(?!=)\s*(.+)$", re.DOTALL)
+_STATEMENT_SPLIT_RE = re.compile(r"[;\n]")
+
+Compiled = Callable[[dict], np.ndarray]
+
+
+def _divide(left, right):
+    if np.any(right == 0):
+        raise ZeroDivisionError("division by zero")
+    return np.true_divide(left, right)
+
+
+def _modulo(left, right):
+    if np.any(right == 0):
+        raise ZeroDivisionError("modulo by zero")
+    return np.mod(left, right)
+
+
+def _power(base, exponent):
+    # Everything is float64, so big results overflow to inf instead of
+    # growing an integer; the bound only rejects absurd exponents early.
+    if np.any(np.abs(exponent) > MAX_EXPONENT):
+        raise ValueError(f"exponent exceeds {MAX_EXPONENT}")
+    return np.power(base, exponent)
+
+
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _divide,
+    ast.Pow: _power,
+    ast.Mod: _modulo,
+}
+_UNARY_OPS = {
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+
+def normalize_expression(expression: str) -> str:
+    return _OPERATOR_SPACE_RE.sub(r"\1", " ".join(expression.split()))
+
+
+def _build(node: ast.AST, depth: int = 0) -> Compiled:
+    if depth > MAX_DEPTH:
+        raise ValueError(f"expression nested deeper than {MAX_DEPTH} levels")
+    if isinstance(node, ast.Expression):
+        return _build(node.body, depth)
+    if (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+    ):
+        value = np.float64(node.value)
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        name = node.id
+
+        def lookup(env: dict):
+            if name not in env:
+                raise ValueError(f"unknown variable: {name}")
+            return env[name]
+
+        return lookup
+    if isinstance(node, ast.BinOp):
+        op = _BINARY_OPS.get(type(node.op))
+        if op is None:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        # Operators associate left, so a flat chain like 1+2+3 grows down the
+        # left side; only right operands (a parenthesized group or a power's
+        # exponent) add nesting. The left spine is bounded by the length limit.
+        left = _build(node.left, depth)
+        right = _build(node.right, depth + 1)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = _build(node.operand, depth + 1)
+        return lambda env: op(operand(env))
+    raise ValueError(f"Unsupported node type: {type(node).__name__}")
+
+
+@functools.lru_cache(maxsize=int(os.getenv("CALCULATOR_CACHE_SIZE", "512")))
+def compile_expression(expression: str) -> Compiled:
+    """Validate and compile a normalized expression into a closure tree.
+
+    Parsing and validation happen once per distinct expression; evaluating
+    the result is a chain of NumPy ufunc calls, so the same closure works
+    on scalars and on arrays of values.
+    """
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise ValueError(f"expression longer than {MAX_EXPRESSION_CHARS} characters")
+    if not _ALLOWED_RE.match(expression):
+        raise ValueError("Invalid characters in mathematical expression")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except RecursionError:
+        raise ValueError(f"expression nested deeper than {MAX_DEPTH} levels")
+    return _build(tree)
+
+
+def _plain(value) -> Union[float, list]:
+    value = np.asarray(value, dtype=float)
+    return float(value) if value.ndim == 0 else value.tolist()
+
+
+def _variables(variables) -> dict:
+    if not variables:
+        return {}
+    if isinstance(variables, str):
+        variables = json.loads(variables)
+    env = {}
+    for name, value in variables.items():
+        if not re.fullmatch(r"[A-Za-z_]\w*", str(name)):
+            raise ValueError(f"invalid variable name: {name}")
+        env[name] = np.asarray(value, dtype=float)
+    return env
 
 
 class CalculatorTool:
     name: str = "Calculator tool"
     description: str = (
-        "Useful to perform any mathematical calculations, like sum, minus, multiplication, division, etc. The input to this tool should be a mathematical expression, a couple examples are `200*7` or `5000/2*10`."
+        "Useful to perform any mathematical calculations, like sum, minus, multiplication, division, etc. The input to this tool should be a mathematical expression, a couple examples are `200*7` or `5000/2*10`. "
+        "Several calculations can be done in one call by separating them with `;` or new lines, and results can be named and reused, e.g. "
+        "`revenue = 574785; net_income = 30425; margin = net_income / revenue * 100`. "
+        "Optional `variables` maps names to numbers or lists of numbers (one per period), which are computed element-wise."
     )
 
-    def _run(self, operation: str) -> float:
+    @telemetry.timed("tool.calculator")
+    def _run(
+        self, operation: Union[str, list], variables: Optional[Union[dict, str]] = None
+    ) -> Union[float, list, dict]:
+        statements = (
+            operation
+            if isinstance(operation, list)
+            else _STATEMENT_SPLIT_RE.split(operation)
+        )
+        statements = [statement.strip() for statement in statements if statement.strip()]
+        if not statements:
+            raise ValueError("Calculation error: empty expression")
         try:
-            allowed_operators = {
-                ast.Add: operator.add,
-                ast.Sub: operator.sub,
-                ast.Mult: operator.mul,
-                ast.Div: operator.truediv,
-                ast.Pow: operator.pow,
-                ast.Mod: operator.mod,
-                ast.USub: operator.neg,
-                ast.UAdd: operator.pos,
-            }
-
-            if not re.match(r'^[0-9+\-*/().% ]+$', operation):
-                raise ValueError("Invalid characters in mathematical expression")
-
-            tree = ast.parse(operation, mode='eval')
-
-            def _eval_node(node):
-                if isinstance(node, ast.Expression):
-                    return _eval_node(node.body)
-                if isinstance(node, ast.Constant):
-                    return node.value
-                if isinstance(node, ast.Num):
-                    return node.n
-                if isinstance(node, ast.BinOp):
-                    left = _eval_node(node.left)
-                    right = _eval_node(node.right)
-                    op = allowed_operators.get(type(node.op))
-                    if op is None:
-                        raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
-                    return op(left, right)
-                if isinstance(node, ast.UnaryOp):
-                    operand = _eval_node(node.operand)
-                    op = allowed_operators.get(type(node.op))
-                    if op is None:
-                        raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
-                    return op(operand)
-                raise ValueError(f"Unsupported node type: {type(node).__name__}")
-
-            return _eval_node(tree)
-
-        except (SyntaxError, ValueError, ZeroDivisionError, TypeError) as e:
+            env = _variables(variables)
+        except (TypeError, ValueError) as e:
             raise ValueError(f"Calculation error: {e}")
-        except Exception:
-            raise ValueError("Invalid mathematical expression")
+
+        results = {}
+        for statement in statements:
+            match = _ASSIGN_RE.match(statement)
+            name, expression = match.groups() if match else (None, statement)
+            try:
+                compiled = compile_expression(normalize_expression(expression))
+                with np.errstate(over="ignore", invalid="ignore"):
+                    value = compiled(env)
+            except (SyntaxError, ValueError, ZeroDivisionError, TypeError) as e:
+                prefix = "Calculation error" if len(statements) == 1 else f"Calculation error in `{statement}`"
+                raise ValueError(f"{prefix}: {e}")
+            except Exception:
+                raise ValueError("Invalid mathematical expression")
+            if name:
+                env[name] = value
+            results[name or expression] = _plain(value)
+
+        if len(statements) == 1 and not match:
+            return results[statements[0]]
+        return results
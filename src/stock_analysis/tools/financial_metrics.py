@@ -0,0 +1,415 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+try:
+    from .. import telemetry, transport
+    from ..filing_store import get_filing_store
+    from ..filings import SEC_HEADERS
+except ImportError:
+    import telemetry
+    import transport
+    from filing_store import get_filing_store
+    from filings import SEC_HEADERS
+
+TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+COMPANY_FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik:010d}.json"
+
+# Line items and the us-gaap tags that report them, in order of preference.
+# Companies switch tags over the years (e.g. ASC 606 revenue), so the first
+# tag with a value for a given year wins.
+CONCEPTS = {
+    "revenue": (
+        "Revenues",
+        "RevenueFromContractWithCustomerExcludingAssessedTax",
+        "SalesRevenueNet",
+    ),
+    "gross_profit": ("GrossProfit",),
+    "operating_income": ("OperatingIncomeLoss",),
+    "net_income": ("NetIncomeLoss",),
+    "operating_cash_flow": ("NetCashProvidedByUsedInOperatingActivities",),
+    "capex": ("PaymentsToAcquirePropertyPlantAndEquipment",),
+    "total_assets": ("Assets",),
+    "total_liabilities": ("Liabilities",),
+    "current_assets": ("AssetsCurrent",),
+    "current_liabilities": ("LiabilitiesCurrent",),
+    "equity": (
+        "StockholdersEquity",
+        "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest",
+    ),
+    "long_term_debt": ("LongTermDebtNoncurrent", "LongTermDebt"),
+    "cash": ("CashAndCashEquivalentsAtCarryingValue",),
+}
+
+# SEC "frames" calendarize and deduplicate facts: CY2023 is a full-year
+# duration, CY2023Q4I the balance at year end.
+_ANNUAL_FRAME_RE = re.compile(r"^CY(\d{4})(Q4I)?$")
+
+_store_lock = threading.Lock()
+_ciks: Optional[dict] = None
+
+
+_SEC_JSON_HEADERS = {key: value for key, value in SEC_HEADERS.items() if key != "Host"}
+
+
+def _sec_get_json(url: str) -> dict:
+    resp = transport.get(url, headers=_SEC_JSON_HEADERS, timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def _asec_get_json(url: str) -> dict:
+    resp = await transport.aget(url, headers=_SEC_JSON_HEADERS, timeout=30)
+    resp.raise_for_status()
+    # Company facts run to megabytes; decode off the event loop.
+    return await asyncio.to_thread(json.loads, resp.content)
+
+
+def _stored_json(key: str, ttl: float) -> tuple[Optional[dict], bool]:
+    """The stored ``{fetched_at, data}`` entry for ``key`` and whether it is fresh."""
+    store = get_filing_store()
+    entry = None
+    if store is not None:
+        raw = store.get(key)
+        if raw:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                entry = None
+    fresh = entry is not None and time.time() - entry["fetched_at"] < ttl
+    telemetry.record("cache", "hit" if fresh else "miss")
+    return entry, fresh
+
+
+def _store_json(key: str, data) -> None:
+    store = get_filing_store()
+    if store is not None:
+        store.put(key, json.dumps({"fetched_at": time.time(), "data": data}))
+
+
+def _cached_json(key: str, ttl: float, fetch) -> dict:
+    """Serve ``key`` from the filing store, refetching once it is ``ttl`` old.
+
+    A stale copy is still returned when the refetch fails, so metrics keep
+    working offline from whatever was fetched before.
+    """
+    entry, fresh = _stored_json(key, ttl)
+    if fresh:
+        return entry["data"]
+    try:
+        data = fetch()
+    except Exception:
+        if entry is not None:
+            return entry["data"]
+        raise
+    _store_json(key, data)
+    return data
+
+
+async def _acached_json(key: str, ttl: float, fetch) -> dict:
+    """Async :func:`_cached_json`; ``fetch`` is a coroutine function.
+
+    Store reads and writes run on a worker thread: a put can walk the whole
+    store to evict, which would stall every analysis on the loop.
+    """
+    entry, fresh = await asyncio.to_thread(_stored_json, key, ttl)
+    if fresh:
+        return entry["data"]
+    try:
+        data = await fetch()
+    except Exception:
+        if entry is not None:
+            return entry["data"]
+        raise
+    await asyncio.to_thread(_store_json, key, data)
+    return data
+
+
+def _cik_map(listing: dict) -> dict[str, int]:
+    return {str(row["ticker"]).upper(): int(row["cik_str"]) for row in listing.values()}
+
+
+def _cik_for(ticker: str) -> Optional[int]:
+    global _ciks
+    with _store_lock:
+        if _ciks is None:
+            _ciks = _cik_map(
+                _cached_json(
+                    "xbrl:company_tickers",
+                    float(os.getenv("XBRL_TICKERS_TTL", "604800")),
+                    lambda: _sec_get_json(TICKERS_URL),
+                )
+            )
+    return _ciks.get(ticker.upper())
+
+
+async def _acik_for(ticker: str) -> Optional[int]:
+    global _ciks
+    if _ciks is None:
+        # Concurrent first calls may each load the listing; it is read from
+        # the store after the first, and they all agree.
+        _ciks = _cik_map(
+            await _acached_json(
+                "xbrl:company_tickers",
+                float(os.getenv("XBRL_TICKERS_TTL", "604800")),
+                lambda: _asec_get_json(TICKERS_URL),
+            )
+        )
+    return _ciks.get(ticker.upper())
+
+
+def _annual_values(facts: dict) -> dict[str, dict[str, float]]:
+    """Reduce a company-facts document to {concept: {year: value}}."""
+    gaap = facts.get("facts", {}).get("us-gaap", {})
+    values: dict[str, dict[str, float]] = {}
+    for concept, tags in CONCEPTS.items():
+        by_year: dict[str, float] = {}
+        for tag in tags:
+            for fact in gaap.get(tag, {}).get("units", {}).get("USD", []):
+                match = _ANNUAL_FRAME_RE.match(fact.get("frame", ""))
+                if match and match.group(1) not in by_year:
+                    by_year[match.group(1)] = float(fact["val"])
+        values[concept] = by_year
+    return values
+
+
+@telemetry.timed("xbrl.facts")
+def company_financials(ticker: str) -> Optional[dict[str, dict[str, float]]]:
+    """Annual line items for ``ticker``, or None when SEC has no XBRL data.
+
+    Only the reduced values are stored, not the multi-megabyte source
+    document, so the cache stays small and loads fast offline.
+    """
+    cik = _cik_for(ticker)
+    if cik is None:
+        return None
+    return _cached_json(
+        f"xbrl:companyfacts:{cik}",
+        float(os.getenv("XBRL_FACTS_TTL", "86400")),
+        lambda: _annual_values(_sec_get_json(COMPANY_FACTS_URL.format(cik=cik))),
+    )
+
+
+@telemetry.timed("xbrl.facts")
+async def acompany_financials(ticker: str) -> Optional[dict[str, dict[str, float]]]:
+    """Async :func:`company_financials`."""
+    cik = await _acik_for(ticker)
+    if cik is None:
+        return None
+
+    async def fetch() -> dict:
+        facts = await _asec_get_json(COMPANY_FACTS_URL.format(cik=cik))
+        return _annual_values(facts)
+
+    return await _acached_json(
+        f"xbrl:companyfacts:{cik}", float(os.getenv("XBRL_FACTS_TTL", "86400")), fetch
+    )
+
+
+class FinancialPanel:
+    """Line items for many tickers as (ticker x year) float arrays.
+
+    Missing values are NaN, so every metric below is a single NumPy
+    expression over all tickers and years at once.
+    """
+
+    def __init__(self, financials: dict[str, dict[str, dict[str, float]]], years: int = 5) -> None:
+        self.tickers = list(financials)
+        all_years = sorted(
+            {year for values in financials.values() for series in values.values() for year in series}
+        )
+        self.years = [int(year) for year in all_years[-years:]]
+        self.columns = {}
+        for concept in CONCEPTS:
+            column = np.full((len(self.tickers), len(self.years)), np.nan)
+            for row, ticker in enumerate(self.tickers):
+                series = financials[ticker].get(concept, {})
+                for col, year in enumerate(self.years):
+                    value = series.get(str(year))
+                    if value is not None:
+                        column[row, col] = value
+            self.columns[concept] = column
+
+    def __getitem__(self, concept: str) -> np.ndarray:
+        return self.columns[concept]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def _growth(values: np.ndarray) -> np.ndarray:
+    growth = np.full(values.shape, np.nan)
+    growth[:, 1:] = _ratio(values[:, 1:] - values[:, :-1], np.abs(values[:, :-1]))
+    return growth
+
+
+def _trend(values: np.ndarray, years: list[int]) -> np.ndarray:
+    """Least-squares slope per row, per year, ignoring missing years."""
+    x = np.broadcast_to(np.asarray(years, dtype=float), values.shape)
+    mask = np.isfinite(values)
+    n = mask.sum(axis=1)
+    xs = np.where(mask, x, 0.0)
+    ys = np.where(mask, values, 0.0)
+    sx, sy = xs.sum(axis=1), ys.sum(axis=1)
+    sxx, sxy = (xs * xs).sum(axis=1), (xs * ys).sum(axis=1)
+    slope = _ratio(n * sxy - sx * sy, n * sxx - sx * sx)
+    slope[n < 3] = np.nan
+    return slope
+
+
+def compute_metrics(panel: FinancialPanel) -> dict[str, np.ndarray]:
+    """Per-year metrics, each a (ticker x year) array, plus per-ticker trends."""
+    revenue = panel["revenue"]
+    metrics = {
+        "revenue": revenue,
+        "revenue_growth": _growth(revenue),
+        "net_income_growth": _growth(panel["net_income"]),
+        "gross_margin": _ratio(panel["gross_profit"], revenue),
+        "operating_margin": _ratio(panel["operating_income"], revenue),
+        "net_margin": _ratio(panel["net_income"], revenue),
+        "free_cash_flow": panel["operating_cash_flow"] - panel["capex"],
+        "return_on_equity": _ratio(panel["net_income"], panel["equity"]),
+        "debt_to_equity": _ratio(panel["long_term_debt"], panel["equity"]),
+        "liabilities_to_assets": _ratio(panel["total_liabilities"], panel["total_assets"]),
+        "current_ratio": _ratio(panel["current_assets"], panel["current_liabilities"]),
+    }
+    metrics["fcf_margin"] = _ratio(metrics["free_cash_flow"], revenue)
+    metrics["operating_margin_trend"] = _trend(metrics["operating_margin"], panel.years)
+    metrics["revenue_growth_trend"] = _trend(metrics["revenue_growth"], panel.years)
+    return metrics
+
+
+_PERCENT_METRICS = (
+    ("revenue_growth", "Revenue growth"),
+    ("net_income_growth", "Net income growth"),
+    ("gross_margin", "Gross margin"),
+    ("operating_margin", "Operating margin"),
+    ("net_margin", "Net margin"),
+    ("fcf_margin", "FCF margin"),
+    ("return_on_equity", "ROE"),
+)
+_RATIO_METRICS = (
+    ("debt_to_equity", "Debt/Equity"),
+    ("liabilities_to_assets", "Liabilities/Assets"),
+    ("current_ratio", "Current ratio"),
+)
+
+
+def _fmt_series(values: np.ndarray, percent: bool) -> str:
+    parts = []
+    for value in values:
+        if np.isnan(value):
+            parts.append("n/a")
+        else:
+            parts.append(f"{value * 100:.1f}%" if percent else f"{value:.2f}")
+    return " | ".join(parts)
+
+
+def _fmt_money(value: float) -> str:
+    if np.isnan(value):
+        return "n/a"
+    return f"${value / 1e9:,.2f}B"
+
+
+def format_metrics(panel: FinancialPanel, metrics: dict[str, np.ndarray], row: int) -> str:
+    ticker = panel.tickers[row]
+    if np.isnan(metrics["revenue"][row]).all():
+        return f"{ticker}: no annual XBRL financials found."
+    lines = [f"{ticker} calendar years {' | '.join(str(year) for year in panel.years)} (SEC XBRL):"]
+    for key, label in (("revenue", "Revenue"), ("free_cash_flow", "Free cash flow")):
+        values = metrics[key][row]
+        if not np.isnan(values).all():
+            lines.append(f"- {label}: {' | '.join(_fmt_money(value) for value in values)}")
+    for labels, percent in ((_PERCENT_METRICS, True), (_RATIO_METRICS, False)):
+        for key, label in labels:
+            values = metrics[key][row]
+            # Skip line items the company doesn't report.
+            if not np.isnan(values).all():
+                lines.append(f"- {label}: {_fmt_series(values, percent)}")
+    for key, label in (
+        ("operating_margin_trend", "Operating margin trend"),
+        ("revenue_growth_trend", "Revenue growth trend"),
+    ):
+        slope = metrics[key][row]
+        if not np.isnan(slope):
+            lines.append(f"- {label}: {slope * 100:+.1f} pts/yr")
+    return "\n".join(lines)
+
+
+def _normalize_tickers(tickers: list[str]) -> list[str]:
+    return list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+
+
+def _format_all(tickers: list[str], outcomes: dict, years: int) -> dict[str, str]:
+    """Format fetched values (or the exception each fetch raised) per ticker."""
+    financials: dict[str, dict] = {}
+    errors: dict[str, str] = {}
+    for ticker in tickers:
+        values = outcomes[ticker]
+        if isinstance(values, BaseException):
+            errors[ticker] = f"{ticker}: financials lookup failed: {values}"
+        elif values is None:
+            errors[ticker] = f"{ticker}: no SEC CIK found for ticker."
+        else:
+            financials[ticker] = values
+
+    results = dict(errors)
+    if financials:
+        panel = FinancialPanel(financials, years)
+        metrics = compute_metrics(panel)
+        for row, ticker in enumerate(panel.tickers):
+            results[ticker] = format_metrics(panel, metrics, row)
+    return {ticker: results[ticker] for ticker in tickers}
+
+
+def financial_metrics(tickers: list[str], years: int = 5) -> dict[str, str]:
+    """Formatted metrics per ticker, computed for all of them in one pass."""
+    tickers = _normalize_tickers(tickers)
+    outcomes: dict = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(tickers) or 1)) as executor:
+        futures = {
+            ticker: executor.submit(telemetry.propagate(company_financials), ticker)
+            for ticker in tickers
+        }
+        for ticker, future in futures.items():
+            try:
+                outcomes[ticker] = future.result()
+            except Exception as exc:
+                outcomes[ticker] = exc
+    return _format_all(tickers, outcomes, years)
+
+
+async def afinancial_metrics(tickers: list[str], years: int = 5) -> dict[str, str]:
+    """Async :func:`financial_metrics`."""
+    tickers = _normalize_tickers(tickers)
+    fetched = await asyncio.gather(
+        *(acompany_financials(ticker) for ticker in tickers), return_exceptions=True
+    )
+    return _format_all(tickers, dict(zip(tickers, fetched)), years)
+
+
+class FinancialMetricsTool:
+    name: str = "Financial metrics tool"
+    description: str = (
+        "Useful to get reported annual financials and computed metrics (revenue and net income growth, "
+        "gross/operating/net and free-cash-flow margins, ROE, debt/equity, liabilities/assets, current ratio, "
+        "multi-year trends) from SEC XBRL data. The input is one or more tickers separated by commas, e.g. `AMZN` or `AMZN, MSFT, GOOGL`."
+    )
+
+    @telemetry.timed("tool.financial_metrics")
+    def _run(self, tickers: str) -> str:
+        names = [name for name in re.split(r"[,\s]+", tickers or "") if name]
+        if not names:
+            return "At least one ticker is required."
+        return "\n\n".join(financial_metrics(names).values())
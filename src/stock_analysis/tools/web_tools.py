@@ -1,11 +1,92 @@
 import os
 import re
-from urllib.parse import quote
-import xml.etree.ElementTree as ET
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Optional
 
-import html2text
-import requests
+try:
+    from .. import telemetry, transport
+    from ..feeds import fetch_feed, format_item, google_news_url
+    from ..provider_health import get_provider_registry
+    from ..search_cache import get_search_cache, normalize_query
+except ImportError:
+    import telemetry
+    import transport
+    from feeds import fetch_feed, format_item, google_news_url
+    from provider_health import get_provider_registry
+    from search_cache import get_search_cache, normalize_query
+
+
+def _serper_configured() -> bool:
+    # Serper is opt-in to prevent hard failures from invalid/blocked keys.
+    use_serper = os.getenv("USE_SERPER", "false").strip().lower() in {
+        "1",
+        "true",
+        "yes",
+    }
+    key = os.getenv("SERPER_API_KEY", "").strip()
+    return use_serper and bool(key) and key.upper() != "KEY"
+
+
+def _serper_search(query: str) -> dict:
+    key = os.getenv("SERPER_API_KEY", "").strip()
+    response = transport.post(
+        "https://google.serper.dev/search",
+        headers={"X-API-KEY": key, "Content-Type": "application/json"},
+        json={"q": query},
+        timeout=20,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _search_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=int(os.getenv("SEARCH_MAX_WORKERS", "16")),
+                thread_name_prefix="search",
+            )
+        return _pool
+
+
+def _merge_results(results: list[list[str]]) -> list[str]:
+    merged = []
+    seen = set()
+    for lines in results:
+        header = ""
+        duplicate = False
+        for line in lines:
+            if not line.startswith(("- ", "  ")):
+                header = line
+                continue
+            if line.startswith("- "):
+                key = re.sub(r"\W+", " ", line.lower()).strip()
+                duplicate = key in seen
+                seen.add(key)
+            # Indented lines ("  Source: ...") follow their item.
+            if duplicate:
+                continue
+            # Headers are only kept when something new follows them.
+            if header:
+                merged.append(header)
+                header = ""
+            merged.append(line)
+    return merged
+
+
+class _NoResults(Exception):
+    """Raised out of the cache loader so an empty answer isn't cached."""
+
+
+def _probe_serper() -> None:
+    _serper_search("test")
 
 
 class BraveSearchAliasTool:
@@ -14,113 +95,163 @@ class BraveSearchAliasTool:
         "Search the web for recent information. Input must be a `query` string."
     )
     _max_chars: int = 700
-    _serper_enabled: Optional[bool] = None
+    _providers = ("serper", "google_news_rss", "duckduckgo")
+
+    def __init__(self) -> None:
+        # Provider health is process-wide. Serper is checked once, off the
+        # request path, instead of a live probe per tool instance.
+        self._registry = get_provider_registry()
+        probe = os.getenv("SEARCH_STARTUP_PROBE", "true").strip().lower()
+        if _serper_configured() and probe in {"1", "true", "yes"}:
+            self._registry.probe_once({"serper": _probe_serper})
 
+    @telemetry.timed("tool.web_search")
     def _run(self, query: str) -> str:
         query = (query or "").strip()
         if not query:
             return "Query is required."
         lines = [f"Query: {query}"]
-        if self._serper_available():
-            try:
-                result = self._serper_search(query)
-                organic = result.get("organic", [])[:3]
-                if organic:
-                    lines.append("Top web results:")
-                    for item in organic:
-                        title = item.get("title", "").strip()
-                        lines.append(f"- {title}")
-
-                news = result.get("news", [])[:3]
-                if news:
-                    lines.append("Top news results:")
-                    for item in news:
-                        title = item.get("title", "").strip()
-                        lines.append(f"- {title}")
-            except Exception as e:
-                self._serper_enabled = False
-                lines.append(f"Serper unavailable ({e}). Using fallback search.")
-                lines.extend(self._fallback_search(query))
-        else:
-            lines.append("Serper unavailable (auth failed, missing key, or service issue). Using fallback search.")
-            lines.extend(self._fallback_search(query))
+
+        def load() -> list[str]:
+            found = self._search(query, lines)
+            if not found:
+                raise _NoResults()
+            return found
+
+        cache = get_search_cache()
+        try:
+            if cache is None:
+                found = self._search(query, lines)
+            else:
+                # Through get_or_load so lookups count towards the cache's hit
+                # rate, identical concurrent queries share one search, and the
+                # outcome lands on this tool's span.
+                found = cache.get_or_load(("web", normalize_query(query)), load)
+        except _NoResults:
+            found = []
+        lines.extend(found or ["Fallback search returned limited data."])
 
         output = "\n".join(lines).strip()
         if len(output) > self._max_chars:
             return output[: self._max_chars] + "\n\n[truncated]"
         return output
 
-    def _serper_available(self) -> bool:
-        if self._serper_enabled is not None:
-            return self._serper_enabled
-
-        # Serper is opt-in to prevent hard failures from invalid/blocked keys.
-        use_serper = os.getenv("USE_SERPER", "false").strip().lower() in {
-            "1",
-            "true",
-            "yes",
-        }
-        if not use_serper:
-            self._serper_enabled = False
-            return False
-
-        key = os.getenv("SERPER_API_KEY", "").strip()
-        if not key or key.upper() == "KEY":
-            self._serper_enabled = False
-            return False
+    def _search(self, query: str, lines: list[str]) -> list[str]:
+        # Routed here rather than in _run, so only real searches take a
+        # half-open circuit's trial slot; cache hits leave it to a caller
+        # that will actually try the provider.
+        providers = [
+            name
+            for name in self._registry.route(self._providers)
+            if name != "serper" or _serper_configured()
+        ]
+        if "serper" not in providers:
+            lines.append("Serper unavailable (disabled, missing key, or unhealthy). Using fallback search.")
+        mode = os.getenv("SEARCH_MODE", "hedged").strip().lower()
+        if mode == "sequential":
+            return self._sequential_search(query, providers, lines)
+        return self._hedged_search(query, providers, merge=mode == "merge")
 
-        try:
-            resp = requests.post(
-                "https://google.serper.dev/search",
-                headers={"X-API-KEY": key, "Content-Type": "application/json"},
-                json={"q": "test"},
-                timeout=12,
-            )
-            self._serper_enabled = resp.status_code == 200
-        except Exception:
-            self._serper_enabled = False
-
-        return self._serper_enabled
-
-    def _serper_search(self, query: str) -> dict:
-        key = os.getenv("SERPER_API_KEY", "").strip()
-        response = requests.post(
-            "https://google.serper.dev/search",
-            headers={"X-API-KEY": key, "Content-Type": "application/json"},
-            json={"q": query},
-            timeout=20,
-        )
-        response.raise_for_status()
-        return response.json()
+    def _call(self, provider: str, query: str) -> list[str]:
+        with telemetry.span(f"search.{provider}"):
+            return self._registry.call(provider, getattr(self, f"_{provider}_search"), query)
+
+    def _sequential_search(self, query: str, providers: list[str], lines: list[str]) -> list[str]:
+        for provider in providers:
+            try:
+                found = self._call(provider, query)
+            except Exception as e:
+                if provider == "serper":
+                    lines.append(f"Serper unavailable ({e}). Using fallback search.")
+                continue
+            if found:
+                return found
+        return []
+
+    def _hedged_search(self, query: str, providers: list[str], merge: bool = False) -> list[str]:
+        """Race providers instead of waiting out each one's timeout in turn.
+
+        The preferred provider starts first. Each next one starts after
+        SEARCH_HEDGE_DELAY seconds, or as soon as the earlier ones have all
+        failed. A delay of 0 fires all of them at once. The first non-empty
+        answer wins. With ``merge`` the answers that arrive before
+        SEARCH_DEADLINE are combined and deduplicated.
+        """
+        delay = float(os.getenv("SEARCH_HEDGE_DELAY", "1.5"))
+        deadline = time.monotonic() + float(os.getenv("SEARCH_DEADLINE", "10"))
+        waiting = list(providers)
+        pending: dict = {}
+        answers: dict[str, list[str]] = {}
+        next_launch = time.monotonic()
+
+        while waiting or pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if waiting and (now >= next_launch or not pending):
+                provider = waiting.pop(0)
+                future = _search_pool().submit(telemetry.propagate(self._call), provider, query)
+                pending[future] = provider
+                next_launch = now + delay
+                continue
+
+            timeout = deadline - now
+            if waiting:
+                timeout = min(timeout, max(0.0, next_launch - now))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    found = future.result()
+                except Exception:
+                    found = []
+                if not found:
+                    # A failed or empty provider hands over to the next one
+                    # right away.
+                    next_launch = time.monotonic()
+                    continue
+                if not merge:
+                    return found
+                answers[provider] = found
+
+        # Stragglers finish in the background and still feed provider health.
+        return _merge_results([answers[name] for name in providers if name in answers])
 
-    def _fallback_search(self, query: str) -> list[str]:
+    def _serper_search(self, query: str) -> list[str]:
         lines = []
-        # 1) Try Google News RSS (no API key required).
-        try:
-            rss_url = (
-                "https://news.google.com/rss/search?"
-                f"q={quote(query)}&hl=en-US&gl=US&ceid=US:en"
-            )
-            rss_resp = requests.get(rss_url, timeout=20)
-            rss_resp.raise_for_status()
-            root = ET.fromstring(rss_resp.text)
-            items = root.findall(".//item")
-            if items:
-                lines.append("Fallback news results:")
-                for item in items[:4]:
-                    title = (item.findtext("title") or "").strip()
-                    lines.append(f"- {title}")
-                return lines
-        except Exception:
-            pass
-
-        # 2) Fallback to DuckDuckGo instant-answer API.
+        result = _serper_search(query)
+        organic = result.get("organic", [])[:3]
+        if organic:
+            lines.append("Top web results:")
+            for item in organic:
+                title = item.get("title", "").strip()
+                lines.append(f"- {title}")
+
+        news = result.get("news", [])[:3]
+        if news:
+            lines.append("Top news results:")
+            for item in news:
+                title = item.get("title", "").strip()
+                lines.append(f"- {title}")
+        return lines
+
+    def _google_news_rss_search(self, query: str) -> list[str]:
+        # Google News RSS needs no API key.
+        items = fetch_feed(google_news_url(query), limit=4)
+        lines = []
+        if items:
+            lines.append("Fallback news results:")
+            lines.extend(f"- {format_item(item)}" for item in items)
+        return lines
+
+    def _duckduckgo_search(self, query: str) -> list[str]:
         url = "https://api.duckduckgo.com/"
         params = {"q": query, "format": "json", "no_html": 1, "no_redirect": 1}
-        response = requests.get(url, params=params, timeout=20)
+        response = transport.get(url, params=params, timeout=20)
         response.raise_for_status()
         data = response.json()
 
+        lines = []
         abstract = (data.get("AbstractText") or "").strip()
         abstract_url = (data.get("AbstractURL") or "").strip()
         if abstract:
@@ -144,9 +275,6 @@ class BraveSearchAliasTool:
             for item in flat_related[:4]:
                 text = (item.get("Text") or "").strip()
                 lines.append(f"- {text}")
-
-        if not lines:
-            lines.append("Fallback search returned limited data.")
         return lines
 
 
@@ -157,13 +285,17 @@ class ReadWebsiteContentAliasTool:
     )
     _max_chars: int = 900
 
+    @telemetry.timed("tool.read_website")
     def _run(self, website_url: str) -> str:
         try:
-            response = requests.get(website_url, timeout=20)
+            response = transport.get(website_url, timeout=20)
             response.raise_for_status()
-            converter = html2text.HTML2Text()
-            converter.ignore_links = False
-            text = converter.handle(response.text)
+            with telemetry.span("html2text"):
+                import html2text
+
+                converter = html2text.HTML2Text()
+                converter.ignore_links = False
+                text = converter.handle(response.text)
             text = re.sub(r"\n{3,}", "\n\n", text).strip()
 
             if len(text) > self._max_chars:
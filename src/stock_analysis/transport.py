@@ -0,0 +1,279 @@
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import asyncio
+
+    import httpx
+    import requests
+    from urllib3.util.retry import Retry
+
+try:
+    from . import telemetry
+except ImportError:
+    import telemetry
+
+# SEC fair-access policy: no more than 10 requests per second.
+_DEFAULT_RATE_LIMITS = {"sec.gov": 10.0}
+
+# requests is imported on first use: it is most of this package's import time,
+# and the API has endpoints (health, metrics) that never touch the network.
+_sessions: dict[str, "requests.Session"] = {}
+_limiters: dict[str, Optional["RateLimiter"]] = {}
+_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Spaces calls evenly so a host never sees more than ``rate`` per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next slot and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _rate_limits() -> dict[str, float]:
+    limits = dict(_DEFAULT_RATE_LIMITS)
+    # HTTP_RATE_LIMITS="www.sec.gov=10,google.serper.dev=5"
+    for item in os.getenv("HTTP_RATE_LIMITS", "").split(","):
+        domain, _, rate = item.partition("=")
+        if domain.strip() and rate.strip():
+            limits[domain.strip().lower()] = float(rate)
+    return limits
+
+
+def _limiter_for(host: str) -> Optional[RateLimiter]:
+    if host not in _limiters:
+        rate = None
+        for domain, value in _rate_limits().items():
+            if host == domain or host.endswith("." + domain):
+                rate = value
+                break
+        _limiters[host] = RateLimiter(rate) if rate and rate > 0 else None
+    return _limiters[host]
+
+
+def _retry() -> "Retry":
+    from urllib3.util.retry import Retry
+
+    options = dict(
+        total=int(os.getenv("HTTP_RETRIES", "2")),
+        connect=int(os.getenv("HTTP_RETRIES", "2")),
+        backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.5")),
+        # A failed read may come after the upstream has done the work, so it
+        # is not retried: a POST would run (and bill) a completion twice.
+        read=False,
+        status_forcelist=(429, 500, 502, 503, 504),
+        # Retrying POST on a 429/5xx is fine for the upstreams used here: the
+        # search or completion was not served.
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=float(os.getenv("HTTP_BACKOFF_JITTER", "0.3")), **options)
+    except TypeError:
+        # urllib3 < 2 has no built-in jitter.
+        return Retry(**options)
+
+
+def _new_session() -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=_retry(),
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url: str) -> "requests.Session":
+    """Return the keep-alive session shared by every caller of ``url``'s host."""
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc.lower()}"
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = _new_session()
+        return session
+
+
+def _replay_url(url: str) -> str:
+    # HTTP_REPLAY_URL sends every upstream call to a local stand-in (see
+    # bench/replay_server.py) as {replay}/{host}{path}?{query}.
+    base = os.getenv("HTTP_REPLAY_URL", "").strip().rstrip("/")
+    if not base or url.startswith(base + "/"):
+        return url
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base}/{parts.netloc}{parts.path or '/'}{query}"
+
+
+def _limiter_for_url(url: str) -> Optional[RateLimiter]:
+    host = (urlsplit(url).hostname or "").lower()
+    with _lock:
+        return _limiter_for(host)
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    limiter = _limiter_for_url(url)
+    if limiter is not None:
+        limiter.acquire()
+    url = _replay_url(url)
+    resp = session_for(url).request(method, url, **kwargs)
+    if not kwargs.get("stream"):
+        telemetry.add("bytes", len(resp.content))
+    return resp
+
+
+def finish(resp: "requests.Response") -> None:
+    """Close a streamed response, counting the bytes read from it."""
+    tell = getattr(resp.raw, "tell", None)
+    if tell is not None:
+        try:
+            telemetry.add("bytes", tell())
+        except Exception:
+            pass
+    resp.close()
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
+
+
+# Async clients for the ASGI server, like the sync sessions one per host,
+# and per event loop since httpx binds a pool to the loop that first uses it.
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, tuple[httpx.AsyncClient, asyncio.Semaphore]]]" = (
+    weakref.WeakKeyDictionary()
+)
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _async_pool(url: str) -> "tuple[httpx.AsyncClient, asyncio.Semaphore]":
+    import asyncio
+
+    import httpx
+
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc.lower()}"
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    pool = pools.get(key)
+    if pool is None:
+        # httpx's pool does work quadratic in its size on every request, so
+        # pools stay small: many concurrent requests per host queue on the
+        # semaphore, which wakes them in O(1), instead of inside httpx.
+        size = int(os.getenv("ASYNC_HTTP_POOL_SIZE", "32"))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            follow_redirects=True,
+        )
+        pool = pools[key] = (client, asyncio.Semaphore(size))
+    return pool
+
+
+async def aclose() -> None:
+    """Close the current loop's clients; called on ASGI shutdown."""
+    import asyncio
+
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for client, _ in pools.values():
+        await client.aclose()
+
+
+def _backoff(attempt: int) -> float:
+    # Same schedule as the urllib3 Retry used by the sync sessions.
+    delay = float(os.getenv("HTTP_BACKOFF", "0.5")) * (2 ** attempt)
+    return delay + random.uniform(0, float(os.getenv("HTTP_BACKOFF_JITTER", "0.3")))
+
+
+async def _asend(
+    client: "httpx.AsyncClient", method: str, url: str, stream: bool, **kwargs
+) -> "httpx.Response":
+    import asyncio
+
+    import httpx
+
+    limiter = _limiter_for_url(url)
+    url = _replay_url(url)
+    retries = int(os.getenv("HTTP_RETRIES", "2"))
+    attempt = 0
+    while True:
+        if limiter is not None:
+            delay = limiter.reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        try:
+            resp = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # Like the sync sessions, only failures to connect are retried;
+            # the request never reached the upstream.
+            if attempt >= retries:
+                raise
+            delay = _backoff(attempt)
+        else:
+            if resp.status_code not in _RETRY_STATUSES or attempt >= retries:
+                return resp
+            retry_after = resp.headers.get("Retry-After", "")
+            await resp.aclose()
+            delay = float(retry_after) if retry_after.isdigit() else _backoff(attempt)
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def arequest(method: str, url: str, **kwargs) -> "httpx.Response":
+    """Async counterpart of :func:`request`, with the body read in full."""
+    client, slots = _async_pool(url)
+    async with slots:
+        resp = await _asend(client, method, url, stream=False, **kwargs)
+    telemetry.add("bytes", len(resp.content))
+    return resp
+
+
+@asynccontextmanager
+async def astream(method: str, url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+    """Open a streamed response; leaving the block closes it early."""
+    client, slots = _async_pool(url)
+    async with slots:
+        resp = await _asend(client, method, url, stream=True, **kwargs)
+        try:
+            yield resp
+        finally:
+            telemetry.add("bytes", resp.num_bytes_downloaded)
+            await resp.aclose()
+
+
+async def aget(url: str, **kwargs) -> "httpx.Response":
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> "httpx.Response":
+    return await arequest("POST", url, **kwargs)